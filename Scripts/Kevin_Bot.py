@@ -1,8 +1,21 @@
 import os
+import atexit
+import contextlib
 import json
 import random
 import asyncio
+import bisect
+import functools
+import hashlib
+import heapq
+import sqlite3
+import sys
+import threading
+import time
+import typing
+from collections import Counter, OrderedDict, deque
 from pathlib import Path
+from types import MappingProxyType
 from dotenv import load_dotenv
 import logging
 import logging.handlers
@@ -10,8 +23,11 @@ import re
 import discord
 from discord.ext import commands
 from discord import app_commands, Interaction
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import itertools
+import math
+import queue
 
 # Load .env if present
 try:
@@ -24,178 +40,2063 @@ ROOT = Path(__file__).parent
 DESKTOP_PATH = os.environ.get("KEVIN_DESKTOP_PATH", str(Path.home() / "Desktop"))
 DESKTOP_PATH = str(Path(os.path.expanduser(DESKTOP_PATH)))
 Path(DESKTOP_PATH).mkdir(parents=True, exist_ok=True)
+# Cluster mode (see kevin_cluster.py): a worker runs the shards listed in
+# KEVIN_SHARD_IDS out of KEVIN_SHARD_COUNT. KEVIN_SHARDED=1 alone runs every
+# shard in this one process.
+SHARD_COUNT = int(os.environ["KEVIN_SHARD_COUNT"]) if os.environ.get("KEVIN_SHARD_COUNT") else None
+SHARD_IDS = [int(x) for x in os.environ.get("KEVIN_SHARD_IDS", "").split(",") if x.strip()] or None
+CLUSTER_ID = int(os.environ.get("KEVIN_CLUSTER_ID", 0))
+CLUSTERED = SHARD_COUNT is not None and SHARD_IDS is not None
 # use a human-readable timestamp (hyphens between date components and time) in log
 LOG_FILE = f"{DESKTOP_PATH}/Kevin_Log_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.txt"
+if CLUSTERED:
+    LOG_FILE = LOG_FILE[:-len(".txt")] + f"_worker{CLUSTER_ID}.txt"
+
+# Log output settings: KEVIN_LOG_FORMAT=json writes one JSON object per line
+# (with guild/command/latency_ms fields where known); the file rotates at
+# KEVIN_LOG_MAX_BYTES or every KEVIN_LOG_ROTATE_HOURS, whichever comes first.
+LOG_FORMAT = os.environ.get("KEVIN_LOG_FORMAT", "text").lower()
+LOG_MAX_BYTES = int(os.environ.get("KEVIN_LOG_MAX_BYTES", 5 * 1024 * 1024))
+LOG_ROTATE_HOURS = float(os.environ.get("KEVIN_LOG_ROTATE_HOURS", 24))
+LOG_BACKUPS = 3
+
+
+class KevinLogHandler(logging.handlers.BaseRotatingHandler):
+    """File handler rotating on size or age; rotated files get a timestamp suffix."""
+
+    def __init__(self, filename, max_bytes, interval, backup_count):
+        super().__init__(filename, "a", encoding="utf-8")
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.backup_count = backup_count
+        self.rollover_at = time.time() + interval if interval else None
+
+    def shouldRollover(self, record):
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return True
+        if self.max_bytes and self.stream is not None:
+            return self.stream.tell() + len(self.format(record)) + 1 >= self.max_bytes
+        return False
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        self.rotate(self.baseFilename, f"{self.baseFilename}.{datetime.now().strftime('%Y-%m-%d_%H-%M-%S-%f')}")
+        rotated = sorted(str(p) for p in Path(self.baseFilename).parent.glob(Path(self.baseFilename).name + ".*"))
+        for old in rotated[:-self.backup_count] if self.backup_count else []:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+        self.stream = self._open()
+        if self.interval:
+            self.rollover_at = time.time() + self.interval
+
+
+class JsonLogFormatter(logging.Formatter):
+    FIELDS = ("guild", "command", "latency_ms")
+
+    def format(self, record):
+        entry = {"time": self.formatTime(record), "level": record.levelname, "message": record.getMessage()}
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        return json.dumps(entry, ensure_ascii=False)
+
 
 logger = logging.getLogger("kevin_bot")
 logger.setLevel(logging.INFO)
-handler = logging.handlers.RotatingFileHandler(LOG_FILE, maxBytes=5 * 1024 * 1024, backupCount=3)
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+handler = KevinLogHandler(LOG_FILE, LOG_MAX_BYTES, LOG_ROTATE_HOURS * 3600, LOG_BACKUPS)
+if LOG_FORMAT == "json":
+    formatter = JsonLogFormatter()
+else:
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 handler.setFormatter(formatter)
-logger.addHandler(handler)
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
+# the event loop only enqueues records; a listener thread does the disk and console I/O
+log_queue = queue.SimpleQueue()
+logger.addHandler(logging.handlers.QueueHandler(log_queue))
+log_listener = logging.handlers.QueueListener(log_queue, handler, console_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+log = logger.info
+
+
+# Metrics (Prometheus text format). Counters and histograms are plain dict
+# updates on the hot path; gauges are callables evaluated only when scraped.
+METRICS_HOST = os.environ.get("KEVIN_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("KEVIN_METRICS_PORT", 9464))  # 0 disables the endpoint
+if METRICS_PORT and CLUSTERED:
+    METRICS_PORT += CLUSTER_ID  # one endpoint per worker
+STARTED_AT = time.time()
+
+
+class Histogram:
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation (inf past the last bucket)."""
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.BUCKETS + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    def __init__(self):
+        self.counters = {}     # (name, labels) -> value
+        self.histograms = {}   # (name, labels) -> Histogram
+        self.gauges = {}       # name -> callable returning a number or {labels: number}
+        self.help = {}
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = self.histograms[key] = Histogram()
+        hist.observe(value)
+
+    def gauge(self, name, fn, text=""):
+        self.gauges[name] = fn
+        if text:
+            self.help[name] = text
+
+    def histograms_for(self, name):
+        return {dict(labels).get("command", ""): hist for (n, labels), hist in self.histograms.items() if n == name}
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = tuple(labels) + tuple(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in pairs) + "}"
+
+    def render(self):
+        out, typed = [], set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                if name in self.help:
+                    out.append(f"# HELP {name} {self.help[name]}")
+                out.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(self.counters.items()):
+            header(name, "counter")
+            out.append(f"{name}{self._labels(labels)} {value}")
+        for (name, labels), hist in sorted(self.histograms.items(), key=lambda item: item[0]):
+            header(name, "histogram")
+            cumulative = 0
+            for bound, n in zip(Histogram.BUCKETS + ("+Inf",), hist.counts):
+                cumulative += n
+                out.append(f"{name}_bucket{self._labels(labels, (('le', bound),))} {cumulative}")
+            out.append(f"{name}_sum{self._labels(labels)} {hist.sum}")
+            out.append(f"{name}_count{self._labels(labels)} {hist.count}")
+        for name, fn in self.gauges.items():
+            try:
+                value = fn()
+            except Exception:
+                continue
+            header(name, "gauge")
+            if isinstance(value, dict):
+                for labels, v in value.items():
+                    out.append(f"{name}{self._labels(labels)} {v}")
+            else:
+                out.append(f"{name} {value}")
+        return "\n".join(out) + "\n"
+
+
+METRICS = Metrics()
+METRICS.describe("kevin_command_latency_seconds", "Command handling time by command and kind (prefix/slash)")
+METRICS.describe("kevin_event_latency_seconds", "Event handler run time by event")
+METRICS.describe("kevin_event_loop_lag_seconds", "Extra delay observed by a periodic event loop probe")
+METRICS.describe("kevin_config_save_seconds", "Time to write a batch of dirty guild configs")
+METRICS.describe("kevin_http_requests_total", "Outbound Discord REST requests by method and route")
+METRICS.describe("kevin_rate_limited_total", "429 responses reported by discord.py")
+METRICS.describe("kevin_gateway_events_total", "Gateway connects, disconnects and resumes")
+
+
+def timed_event(func):
+    """Record an event handler's run time in kevin_event_latency_seconds."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            METRICS.observe("kevin_event_latency_seconds", time.perf_counter() - started, event=func.__name__)
+    return wrapper
+
+
+class _RateLimitCounter(logging.Handler):
+    # discord.py retries 429s internally and only reports them through its logger
+    def emit(self, record):
+        if record.levelno >= logging.WARNING and "rate limited" in record.getMessage():
+            METRICS.inc("kevin_rate_limited_total")
+
+
+logging.getLogger("discord.http").addHandler(_RateLimitCounter())
+
+
+# Background task supervisor. Long-running loops are named singletons (starting
+# one that is already running returns the existing task), short-lived work is
+# spawned under an owner whose concurrency is capped, failures are logged and
+# counted, and everything is cancelled when the bot closes.
+class TaskSupervisor:
+    DEFAULT_LIMIT = 500
+
+    def __init__(self):
+        self.named = {}     # name -> task, for singletons
+        self.owners = {}    # task -> owner, for every live task
+        self.limits = {}    # owner -> Semaphore capping spawned tasks
+
+    def set_limit(self, owner, limit):
+        self.limits[owner] = asyncio.Semaphore(limit)
+
+    def start(self, name, factory, owner="core"):
+        """Start ``factory()`` as the singleton task ``name`` unless it is already running."""
+        task = self.named.get(name)
+        if task is not None and not task.done():
+            return task
+        task = asyncio.create_task(factory(), name=name)
+        self.named[name] = task
+        self._track(task, owner)
+        return task
+
+    async def spawn(self, coro, owner, name=None):
+        """Run ``coro`` as a tracked task, waiting first if ``owner`` is at its concurrency limit."""
+        sem = self.limits.get(owner)
+        if sem is None:
+            sem = self.limits[owner] = asyncio.Semaphore(self.DEFAULT_LIMIT)
+        await sem.acquire()
+        task = asyncio.create_task(coro, name=name)
+        task.add_done_callback(lambda _: sem.release())
+        self._track(task, owner)
+        return task
+
+    def cancel(self, name):
+        task = self.named.get(name)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    def running(self, name):
+        task = self.named.get(name)
+        return task is not None and not task.done()
+
+    def counts(self):
+        return Counter(self.owners.values())
+
+    def _track(self, task, owner):
+        self.owners[task] = owner
+        task.add_done_callback(self._finished)
+
+    def _finished(self, task):
+        owner = self.owners.pop(task, "unknown")
+        if self.named.get(task.get_name()) is task:
+            del self.named[task.get_name()]
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None:
+            METRICS.inc("kevin_task_failures_total", owner=owner)
+            logger.error(f"Background task {task.get_name()} ({owner}) failed: {exc!r}", exc_info=exc)
+
+    async def shutdown(self):
+        tasks = [task for task in self.owners if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        log(f"Cancelled {len(tasks)} background task(s)")
+
+
+SUPERVISOR = TaskSupervisor()
+METRICS.describe("kevin_task_failures_total", "Supervised background tasks that raised")
+
+
+# Outbound dispatcher. Messages from moderation replies, the mod log, reminders
+# and random messages are queued per destination and sent by one task that
+# keeps a token bucket for every destination plus one for the whole bot, so
+# bursts wait here instead of running into 429s. Each destination sends one
+# message at a time in priority order; a throttled destination never holds up
+# the others. Consecutive small text messages to the same place can be merged.
+PRIORITY_MOD, PRIORITY_LOG, PRIORITY_REMINDER, PRIORITY_BULK = range(4)
+PRIORITY_NAMES = ("mod", "log", "reminder", "bulk")
+
+
+class OutboxFull(discord.DiscordException):
+    """Raised when a destination's queue is full and the message isn't a moderation reply."""
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "stamp")
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.stamp = now
+
+    def wait_time(self, now):
+        """Seconds until a token is available (0 if one is available now)."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def idle(self, now):
+        return self.tokens + (now - self.stamp) * self.rate >= self.capacity
+
+
+class Outbox:
+    # (tokens per second, burst) by destination kind; Discord allows about 5 messages per 5s per channel
+    LIMITS = {"channel": (1.0, 5), "user": (1.0, 5), "gateway": (5 / 60, 5)}
+    GLOBAL_RATE, GLOBAL_BURST = 40.0, 50  # REST requests per second across the bot
+    MAX_QUEUED = 200                      # per destination; only moderation replies may go past it
+    MESSAGE_LIMIT = 2000
+    MAX_IN_FLIGHT = 50                    # sends awaiting Discord at once
+
+    def __init__(self):
+        self.queues = {}      # key -> heap of (priority, seq, make, text, merge, future, queued at)
+        self.buckets = {}     # key -> TokenBucket
+        self.busy = set()     # keys with a send in flight
+        self.ready = []       # heap of (priority, seq, key) for destinations that may have work
+        self.listed = {}      # key -> priority of its live entry in ready
+        self.waiting = []     # heap of (when, key) for destinations out of tokens
+        self.parked = set()   # keys in waiting; each is parked at most once
+        self.queued = Counter()  # priority -> items queued
+        self.global_bucket = None
+        self._seq = itertools.count()
+        self._wakeup = None
+
+    def start(self):
+        if self._wakeup is None:
+            SUPERVISOR.set_limit("outbox-send", self.MAX_IN_FLIGHT)
+            self._wakeup = asyncio.Event()
+            self.global_bucket = TokenBucket(self.GLOBAL_RATE, self.GLOBAL_BURST, time.monotonic())
+        return SUPERVISOR.start("outbox", self._run, owner="outbox")
+
+    @staticmethod
+    def key_for(destination):
+        if isinstance(destination, discord.abc.User):
+            return ("user", destination.id)
+        return ("channel", getattr(destination, "channel", destination).id)
+
+    def submit(self, key, make, priority, text=None, merge=False):
+        """Queue ``make(text)`` for ``key``; returns a future for its result."""
+        queue = self.queues.setdefault(key, [])
+        if len(queue) >= self.MAX_QUEUED and priority != PRIORITY_MOD:
+            METRICS.inc("kevin_outbound_rejected_total", priority=PRIORITY_NAMES[priority])
+            raise OutboxFull(f"Too many messages queued for {key[0]} {key[1]}")
+        future = asyncio.get_running_loop().create_future()
+        seq = next(self._seq)
+        heapq.heappush(queue, (priority, seq, make, text, merge and text is not None, future, time.monotonic()))
+        self.queued[priority] += 1
+        if key not in self.busy and key not in self.parked and priority < self.listed.get(key, len(PRIORITY_NAMES)):
+            self._list(key, priority, seq)
+            if self._wakeup is not None:
+                self._wakeup.set()
+        return future
+
+    def _list(self, key, priority, seq):
+        """Put ``key`` on the ready heap; a better priority supersedes its earlier entry."""
+        self.listed[key] = priority
+        heapq.heappush(self.ready, (priority, seq, key))
+
+    async def send(self, destination, content=None, *, priority=PRIORITY_MOD, merge=False, **kwargs):
+        """``destination.send(content, **kwargs)`` through the queue; returns the sent message."""
+        return await self.submit(self.key_for(destination), lambda text: destination.send(text, **kwargs),
+                                 priority, text=content, merge=merge and not kwargs)
+
+    async def call(self, key, coro_factory, priority=PRIORITY_BULK):
+        """Run ``coro_factory()`` under ``key``'s rate limit (e.g. gateway presence updates)."""
+        return await self.submit(key, lambda _: coro_factory(), priority)
+
+    def pending(self):
+        return sum(self.queued.values())
+
+    def _take_batch(self, queue):
+        first = heapq.heappop(queue)
+        batch = [first]
+        if first[4]:
+            size = len(first[3])
+            while queue and queue[0][4] and queue[0][0] == first[0] and size + 1 + len(queue[0][3]) <= self.MESSAGE_LIMIT:
+                item = heapq.heappop(queue)
+                batch.append(item)
+                size += 1 + len(item[3])
+        return batch
+
+    async def _deliver(self, key, batch):
+        priority, make = batch[0][0], batch[0][2]
+        self.queued[priority] -= len(batch)
+        now = time.monotonic()
+        for item in batch:
+            METRICS.observe("kevin_outbound_wait_seconds", now - item[6], priority=PRIORITY_NAMES[priority])
+        batch = [item for item in batch if not item[5].cancelled()]  # the sender gave up waiting
+        try:
+            if not batch:
+                return
+            text = "\n".join(item[3] for item in batch) if len(batch) > 1 else batch[0][3]
+            result = await make(text)
+        except Exception as e:
+            METRICS.inc("kevin_outbound_failed_total", priority=PRIORITY_NAMES[priority])
+            for item in batch:
+                if not item[5].done():
+                    item[5].set_exception(e)
+        else:
+            METRICS.inc("kevin_outbound_sent_total", priority=PRIORITY_NAMES[priority])
+            if len(batch) > 1:
+                METRICS.inc("kevin_outbound_merged_total", len(batch) - 1)
+            for item in batch:
+                if not item[5].done():
+                    item[5].set_result(result)
+        finally:
+            self.busy.discard(key)
+            queue = self.queues.get(key)
+            if queue:
+                self._list(key, queue[0][0], queue[0][1])
+            else:
+                self.queues.pop(key, None)
+            self._wakeup.set()
+
+    def _prune(self, now):
+        for key in [k for k, b in self.buckets.items() if k not in self.queues and b.idle(now)]:
+            del self.buckets[key]
+
+    async def _run(self):
+        last_prune = time.monotonic()
+        while True:
+            now = time.monotonic()
+            while self.waiting and self.waiting[0][0] <= now:
+                _, key = heapq.heappop(self.waiting)
+                self.parked.discard(key)
+                queue = self.queues.get(key)
+                if queue:
+                    self._list(key, queue[0][0], queue[0][1])
+            timeout = self.waiting[0][0] - now if self.waiting else None
+            while self.ready:
+                priority, _, key = self.ready[0]
+                queue = self.queues.get(key)
+                if not queue or key in self.busy or self.listed.get(key) != priority:
+                    heapq.heappop(self.ready)  # stale entry
+                    continue
+                bucket = self.buckets.get(key)
+                if bucket is None:
+                    bucket = self.buckets[key] = TokenBucket(*self.LIMITS[key[0]], now)
+                wait = bucket.wait_time(now)
+                if wait:
+                    heapq.heappop(self.ready)
+                    del self.listed[key]
+                    self.parked.add(key)
+                    heapq.heappush(self.waiting, (now + wait, key))
+                    timeout = min(timeout, wait) if timeout is not None else wait
+                    continue
+                if key[0] != "gateway":
+                    wait = self.global_bucket.wait_time(now)
+                    if wait:
+                        timeout = min(timeout, wait) if timeout is not None else wait
+                        break
+                    self.global_bucket.take()
+                bucket.take()
+                heapq.heappop(self.ready)
+                del self.listed[key]
+                self.busy.add(key)
+                await SUPERVISOR.spawn(self._deliver(key, self._take_batch(queue)), owner="outbox-send")
+            if now - last_prune > 60:
+                self._prune(now)
+                last_prune = now
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+OUTBOX = Outbox()
+METRICS.describe("kevin_outbound_wait_seconds", "Time outbound messages spent queued, by priority")
+METRICS.describe("kevin_outbound_rejected_total", "Outbound messages refused because a destination's queue was full")
+
+# Shared on-disk store (SQLite in WAL mode) for state that must survive restarts
+STORE_PATH = Path(os.path.expanduser(os.environ.get("KEVIN_STORE_PATH", str(ROOT / "kevin.db"))))
+
+
+class Store:
+    """Small thread-safe wrapper around one SQLite connection.
+
+    Calls are cheap indexed statements, so they may run on the event loop;
+    anything heavier should be pushed through ``asyncio.to_thread``.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.RLock()
+        # other cluster workers may hold the write lock briefly; wait instead of failing
+        self.conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._local = threading.local()
+
+    def script(self, sql):
+        with self.lock, self.conn:
+            self.conn.executescript(sql)
+
+    def execute(self, sql, params=()):
+        with self.lock, self.conn:
+            return self.conn.execute(sql, params)
+
+    def executemany(self, sql, rows):
+        with self.lock, self.conn:
+            self.conn.executemany(sql, rows)
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def thread_connection(self):
+        """A connection owned by the calling thread, for writes pushed off the event loop.
+
+        WAL lets it commit while the loop keeps reading through ``conn``; using
+        ``conn`` here would make every loop-side query wait on ``lock`` meanwhile.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Read-then-write sequence under SQLite's write lock, committed on exit."""
+        with self.lock, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            yield self.conn
+
+
+STORE = Store(STORE_PATH)
+STORE.script("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+
+def shard_filter(column="guild_id"):
+    """SQL condition (and params) limiting rows to guilds on this worker's shards.
+
+    Rows without a guild (DMs) belong to shard 0, which is where Discord delivers DMs.
+    """
+    if not CLUSTERED:
+        return "1", ()
+    marks = ", ".join("?" * len(SHARD_IDS))
+    return f"((COALESCE({column}, 0) >> 22) % ?) IN ({marks})", (SHARD_COUNT, *SHARD_IDS)
+
+
+# Per-guild config (from Ron). Each guild is one row in the store; rows are
+# loaded the first time a guild is seen and written back by a background
+# flusher that coalesces all guilds changed within CONFIG_FLUSH_INTERVAL.
+CONFIG_PATH = ROOT / "configs.json"  # legacy file, imported into the store once
+CONFIG_FLUSH_INTERVAL = 2.0
+
+DEFAULT_PREFIX = os.getenv("PREFIX", "?")  # user's request: new prefix is '?'
+
+CONFIGS = {}
+_DIRTY_GUILDS = set()
+_config_flush_event = None
+
+STORE.script("CREATE TABLE IF NOT EXISTS guild_configs (guild_id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+
+# Guild configs are sparse: every guild shares one read-only table of defaults and
+# only holds (and persists) the fields it has changed. GuildConfig overlays the two
+# behind the dict methods the commands already use.
+GUILD_CONFIG_DEFAULTS = MappingProxyType({
+    "prefix": DEFAULT_PREFIX,
+    "mod_role": None,
+    "log_channel": None,
+    "welcome_channel": None,
+    # added for enhanced config
+    "timezone": None,                  # e.g. "UTC", "America/New_York"
+    "reminder_channel": None,          # default channel ID for reminders (names in legacy configs)
+    "aliases": MappingProxyType({}),   # custom command aliases
+    "random_interval": 0,              # seconds between random messages; 0 is off
+    "random_count": 1,                 # messages per interval (at most, with random_auto)
+    "random_auto": True,               # re-draw each gap (50-150% of the interval) and count
+    "random_channel": None,            # channel ID random messages go to
+    "automod": False,                  # mute members who flood, repeat or mass-mention
+    "automod_messages": 8,             # messages allowed per automod_window
+    "automod_window": 5,               # seconds the automod limits are counted over
+    "automod_duplicates": 4,           # identical messages allowed per window
+    "automod_mentions": 10,            # user/role mentions allowed per window
+    "automod_mute_minutes": 10,        # automatic mute length; 0 waits for a manual unmute
+})
+_MISSING = object()
+
+
+class GuildConfig:
+    __slots__ = ("overrides",)
+
+    def __init__(self, stored=None):
+        # stored records from older versions carry every field; keep only the changed ones
+        self.overrides = None
+        for key, value in (stored or {}).items():
+            if value != GUILD_CONFIG_DEFAULTS.get(key, _MISSING):
+                self[key] = value
+
+    def __getitem__(self, key):
+        if self.overrides and key in self.overrides:
+            return self.overrides[key]
+        return GUILD_CONFIG_DEFAULTS[key]
+
+    def __setitem__(self, key, value):
+        if self.overrides is None:
+            self.overrides = {}
+        self.overrides[key] = value
+
+    def get(self, key, default=None):
+        if self.overrides and key in self.overrides:
+            return self.overrides[key]
+        return GUILD_CONFIG_DEFAULTS.get(key, default)
+
+    def setdefault(self, key, default=None):
+        """Like dict.setdefault, but copies a shared default so it can be modified in place."""
+        if self.overrides and key in self.overrides:
+            return self.overrides[key]
+        value = GUILD_CONFIG_DEFAULTS.get(key, default)
+        if isinstance(value, MappingProxyType):
+            value = dict(value)
+        self[key] = value
+        return value
+
+    def as_dict(self):
+        """Every field, defaults included (for display)."""
+        merged = {**GUILD_CONFIG_DEFAULTS, **(self.overrides or {})}
+        return {key: dict(value) if isinstance(value, MappingProxyType) else value for key, value in merged.items()}
+
+    def sparse(self):
+        """The fields that differ from the defaults; this is what gets stored."""
+        return {key: value for key, value in (self.overrides or {}).items()
+                if value != GUILD_CONFIG_DEFAULTS.get(key, _MISSING)}
+
+
+def _migrate_legacy_configs():
+    if not CONFIG_PATH.exists():
+        return
+    try:
+        legacy = json.loads(CONFIG_PATH.read_text())
+        rows = [(gid, GuildConfig(cfg).sparse()) for gid, cfg in legacy.items()]
+        STORE.executemany(
+            "INSERT OR IGNORE INTO guild_configs (guild_id, data) VALUES (?, ?)",
+            [(gid, json.dumps(data)) for gid, data in rows if data],
+        )
+        CONFIG_PATH.replace(CONFIG_PATH.with_name(CONFIG_PATH.name + ".migrated"))
+        log(f"Imported {len(legacy)} guild config(s) from {CONFIG_PATH.name}")
+    except Exception as e:
+        log(f"Failed to import legacy configs: {e}")
+
+
+_migrate_legacy_configs()
+
+
+def _compact_stored_configs():
+    """Rewrite full records saved by older versions as sparse overrides (runs once per store)."""
+    if STORE.query("SELECT 1 FROM kv WHERE key = 'config_format' AND value = 'sparse'"):
+        return
+    rows = [(gid, GuildConfig(json.loads(data)).sparse()) for gid, data in
+            STORE.query("SELECT guild_id, data FROM guild_configs")]
+    with STORE.lock, STORE.conn:
+        STORE.conn.executemany("DELETE FROM guild_configs WHERE guild_id = ?", [(gid,) for gid, data in rows if not data])
+        STORE.conn.executemany("UPDATE guild_configs SET data = ? WHERE guild_id = ?",
+                               [(json.dumps(data), gid) for gid, data in rows if data])
+        STORE.conn.execute("INSERT OR REPLACE INTO kv (key, value) VALUES ('config_format', 'sparse')")
+    dropped = sum(1 for _, data in rows if not data)
+    if rows:
+        log(f"Compacted {len(rows)} stored guild config(s); {dropped} held only defaults and were removed")
+
+
+_compact_stored_configs()
+
+
+def save_configs(guild_id=None):
+    """Mark a guild's config (or every loaded config) dirty; the flusher writes it shortly."""
+    if guild_id is None:
+        _DIRTY_GUILDS.update(CONFIGS)
+    else:
+        _DIRTY_GUILDS.add(str(guild_id))
+    if _config_flush_event is not None:
+        _config_flush_event.set()
+
+
+STORE.script("""
+    CREATE TABLE IF NOT EXISTS config_invalidations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id TEXT NOT NULL,
+        origin INTEGER NOT NULL,
+        created REAL NOT NULL
+    )
+""")
+CONFIG_INVALIDATION_POLL = 1.0
+
+
+def _write_configs(rows):
+    """Store ``(guild_id, json)`` rows; a ``None`` payload means the guild is back to defaults.
+
+    Runs in a worker thread on that thread's own connection, so the loop never waits on it.
+    """
+    conn = STORE.thread_connection()
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO guild_configs (guild_id, data) VALUES (?, ?)",
+                         [row for row in rows if row[1] is not None])
+        conn.executemany("DELETE FROM guild_configs WHERE guild_id = ?",
+                         [(gid,) for gid, data in rows if data is None])
+        if CLUSTERED:
+            # tell the other workers to drop their cached copy
+            now = time.time()
+            conn.executemany(
+                "INSERT INTO config_invalidations (guild_id, origin, created) VALUES (?, ?, ?)",
+                [(gid, CLUSTER_ID, now) for gid, _ in rows],
+            )
+
+
+def drop_guild_caches(guild_id):
+    """Forget everything cached for a guild so it is reloaded from the store on next use."""
+    key = str(guild_id)
+    if key in _DIRTY_GUILDS:
+        return  # unsaved local changes win; they are about to be written
+    CONFIGS.pop(key, None)
+    ALIAS_TABLES.pop(key, None)
+    PREFIX_CACHE.pop(int(guild_id), None)
+    invalidate_auth(int(guild_id))
+
+
+async def config_invalidation_watcher():
+    """Cluster mode: apply config invalidations published by other workers or kevin_cluster.py."""
+    last_id = STORE.query("SELECT COALESCE(MAX(id), 0) FROM config_invalidations")[0][0]
+    polls = 0
+    while True:
+        await asyncio.sleep(CONFIG_INVALIDATION_POLL)
+        rows = STORE.query("SELECT id, guild_id, origin FROM config_invalidations WHERE id > ? ORDER BY id", (last_id,))
+        for row_id, guild_id, origin in rows:
+            last_id = row_id
+            if origin != CLUSTER_ID:
+                drop_guild_caches(guild_id)
+        polls += 1
+        if polls % 3600 == 0:
+            STORE.execute("DELETE FROM config_invalidations WHERE created < ?", (time.time() - 3600,))
+
+
+def _take_dirty_configs():
+    rows = []
+    for gid in _DIRTY_GUILDS:
+        if gid in CONFIGS:
+            data = CONFIGS[gid].sparse()
+            rows.append((gid, json.dumps(data) if data else None))
+    _DIRTY_GUILDS.clear()
+    return rows
+
+
+async def config_flusher():
+    global _config_flush_event
+    _config_flush_event = asyncio.Event()
+    if _DIRTY_GUILDS:
+        _config_flush_event.set()
+    flushes = 0
+    while True:
+        await _config_flush_event.wait()
+        await asyncio.sleep(CONFIG_FLUSH_INTERVAL)
+        _config_flush_event.clear()
+        # serialize on the loop for a consistent snapshot; the write happens off it
+        rows = _take_dirty_configs()
+        if not rows:
+            continue
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(_write_configs, rows)
+        except Exception as e:
+            log(f"Failed to save configs: {e}")
+            _DIRTY_GUILDS.update(gid for gid, _ in rows)
+            continue
+        elapsed = time.perf_counter() - started
+        METRICS.observe("kevin_config_save_seconds", elapsed)
+        log(f"Saved {len(rows)} guild config(s) in {elapsed * 1000:.1f}ms")
+        flushes += 1
+        if flushes % 100 == 0:
+            await asyncio.to_thread(lambda: STORE.thread_connection().execute("PRAGMA wal_checkpoint(TRUNCATE)"))
+
+
+def flush_configs_now():
+    """Synchronously persist pending config changes (used on shutdown)."""
+    rows = _take_dirty_configs()
+    if rows:
+        _write_configs(rows)
+
+
+def get_guild_config(guild_id: int):
+    """Return the guild's GuildConfig, loading its overrides from the store on first use."""
+    key = str(guild_id)
+    cfg = CONFIGS.get(key)
+    if cfg is None:
+        row = STORE.query("SELECT data FROM guild_configs WHERE guild_id = ?", (key,))
+        cfg = CONFIGS[key] = GuildConfig(json.loads(row[0][0]) if row else None)
+    return cfg
+
+
+# Intents and cache policy. KEVIN_MEMORY_PROFILE picks how much member state is
+# kept in memory:
+#   full    - chunk every guild at startup and cache all members (discord.py's default)
+#   lean    - no startup chunking; members are cached as they join or are looked up
+#   minimal - no members intent and no member cache; members are fetched when needed
+# KEVIN_MAX_MESSAGES bounds the message cache (0 disables it).
+MEMORY_PROFILES = {
+    "full": (True, True, discord.MemberCacheFlags.all),
+    "lean": (True, False, lambda: discord.MemberCacheFlags(voice=False, joined=True)),
+    "minimal": (False, False, discord.MemberCacheFlags.none),
+}
+MEMORY_PROFILE = os.environ.get("KEVIN_MEMORY_PROFILE", "full").lower()
+if MEMORY_PROFILE not in MEMORY_PROFILES:
+    raise SystemExit(f"Unknown KEVIN_MEMORY_PROFILE {MEMORY_PROFILE!r} (use {', '.join(MEMORY_PROFILES)})")
+MAX_MESSAGES = int(os.environ.get("KEVIN_MAX_MESSAGES", "1000")) or None
+
+intents = discord.Intents.default()
+intents.message_content = True
+intents.members, CHUNK_AT_STARTUP, _member_cache_flags = MEMORY_PROFILES[MEMORY_PROFILE]
+
+
+# Per-guild prefix tuples (mention forms first, like when_mentioned_or). The
+# tuple is passed straight to str.startswith, so on_message can drop plain chat
+# before any command parsing. Entries are dropped by invalidate_prefix().
+PREFIX_CACHE = {}
+MESSAGE_STATS = {"seen": 0, "skipped": 0}
+MESSAGE_STATS_LOG_EVERY = 10000
+
+
+def guild_prefixes(guild_id=None):
+    prefixes = PREFIX_CACHE.get(guild_id)
+    if prefixes is None:
+        prefix = get_guild_config(guild_id).get("prefix", DEFAULT_PREFIX) if guild_id else DEFAULT_PREFIX
+        prefixes = (f"<@{bot.user.id}> ", f"<@!{bot.user.id}> ", prefix)
+        PREFIX_CACHE[guild_id] = prefixes
+    return prefixes
+
+
+def invalidate_prefix(guild_id):
+    PREFIX_CACHE.pop(guild_id, None)
+
+
+async def determine_prefix(bot, message):
+    return guild_prefixes(message.guild.id if message.guild else None)
+
+
+bot_options = dict(command_prefix=determine_prefix, intents=intents, description="Kevin - merged with Ron",
+                   member_cache_flags=_member_cache_flags(), chunk_guilds_at_startup=CHUNK_AT_STARTUP,
+                   max_messages=MAX_MESSAGES)
+
+
+class SupervisedClose:
+    """Cancels supervised background tasks before discord.py tears down the connection."""
+
+    async def close(self):
+        await SUPERVISOR.shutdown()
+        await super().close()
+
+
+class KevinBot(SupervisedClose, commands.Bot):
+    pass
+
+
+class ShardedKevinBot(SupervisedClose, commands.AutoShardedBot):
+    pass
+
+
+if CLUSTERED or os.environ.get("KEVIN_SHARDED"):
+    bot = ShardedKevinBot(shard_count=SHARD_COUNT, shard_ids=SHARD_IDS, **bot_options)
+else:
+    bot = KevinBot(**bot_options)
+
+# Compiled alias tables, keyed by guild id. Each table maps the first word of an
+# alias to its (alias, expansion) pairs, longest alias first, so expanding a
+# message is one dict lookup on the command word. Tables are rebuilt lazily after
+# invalidate_aliases() is called by the alias add/remove commands.
+ALIAS_TABLES = {}
+
+
+def invalidate_aliases(guild_id):
+    ALIAS_TABLES.pop(str(guild_id), None)
+
+
+def _alias_table(guild_id, cfg):
+    key = str(guild_id)
+    table = ALIAS_TABLES.get(key)
+    if table is None:
+        table = {}
+        for alias, expansion in (cfg.get("aliases") or {}).items():
+            words = alias.split(None, 1)
+            if words:
+                table.setdefault(words[0], []).append((alias, expansion))
+        for candidates in table.values():
+            candidates.sort(key=lambda pair: len(pair[0]), reverse=True)
+        ALIAS_TABLES[key] = table
+    return table
+
+
+def expand_alias(guild_id, cfg, body):
+    """Return ``body`` (message text after the prefix) with a leading alias expanded, or None."""
+    table = _alias_table(guild_id, cfg)
+    if not table or not body:
+        return None
+    words = body.split(None, 1)
+    candidates = table.get(words[0]) if words else None
+    if not candidates:
+        return None
+    for alias, expansion in candidates:
+        end = len(alias)
+        if body.startswith(alias) and (end == len(body) or body[end].isspace()):
+            # rewrite the command portion and leave remainder intact
+            return expansion + body[end:]
+    return None
+
+
+# intercept messages to process custom aliases
+@bot.event
+@timed_event
+async def on_message(message):
+    MESSAGE_STATS["seen"] += 1
+    if MESSAGE_STATS["seen"] % MESSAGE_STATS_LOG_EVERY == 0:
+        log(f"Message fast path: skipped {MESSAGE_STATS['skipped']} of {MESSAGE_STATS['seen']} messages")
+    if message.guild and not message.author.bot:
+        automod_check(message)
+    # bots never run commands, and anything without a prefix can't be one
+    if message.author.bot or not message.content.startswith(guild_prefixes(message.guild.id if message.guild else None)):
+        MESSAGE_STATS["skipped"] += 1
+        return
+    if not message.guild:
+        await bot.process_commands(message)
+        return
+
+    cfg = get_guild_config(message.guild.id)
+    prefix = cfg.get("prefix", DEFAULT_PREFIX)
+    if message.content.startswith(prefix):
+        expanded = expand_alias(message.guild.id, cfg, message.content[len(prefix):])
+        if expanded is not None:
+            message.content = prefix + expanded
+
+    await bot.process_commands(message)
+try:
+    bot.remove_command('help')
+except Exception:
+    pass
+
+# Some utilities
+QUOTES = [  # used when a server has no quotes of its own
+    "Be kind. Be curious. - Ron",
+    "Small steps every day.",
+    "Don't forget to take breaks!",
+    "Code, test, iterate."
+]
+
+
+# DM functionality has been removed; the ALLOWED_DM_USER_ID setting is no longer used.
+
+
+# Name -> ID index for each guild's text channels and roles. Built on first use
+# and kept current by the channel/role events below, so resolving a config
+# entry is a dict lookup. Config stores IDs; plain names are legacy entries.
+GUILD_INDEX = {}  # guild id -> (text channel name -> id, role name -> id)
+
+
+def guild_index(guild):
+    index = GUILD_INDEX.get(guild.id)
+    if index is None:
+        channels, roles = {}, {}
+        for ch in guild.text_channels:
+            channels.setdefault(ch.name, ch.id)
+        for role in guild.roles:
+            roles.setdefault(role.name, role.id)
+        index = GUILD_INDEX[guild.id] = (channels, roles)
+    return index
+
+
+def resolve_channel(guild, ref):
+    """Return the text channel for a stored config value (channel ID, or a name for legacy entries)."""
+    if ref is None:
+        return None
+    if isinstance(ref, int):
+        return guild.get_channel(ref)
+    channel_id = guild_index(guild)[0].get(ref)
+    return guild.get_channel(channel_id) if channel_id else None
+
+
+def resolve_role(guild, ref):
+    """Return the role for a stored config value (role ID, or a name for legacy entries)."""
+    if ref is None:
+        return None
+    if isinstance(ref, int):
+        return guild.get_role(ref)
+    role_id = guild_index(guild)[1].get(ref)
+    return guild.get_role(role_id) if role_id else None
+
+
+def channel_ref(guild, name):
+    # store the ID when the channel exists, otherwise keep the name so it resolves once created
+    channel = resolve_channel(guild, name)
+    return channel.id if channel else name
+
+
+def role_ref(guild, name):
+    role = resolve_role(guild, name)
+    return role.id if role else name
+
+
+def describe_ref(ref, resolved):
+    return resolved.name if resolved else ref
+
+
+def _index_add(guild_id, kind, name, obj_id):
+    index = GUILD_INDEX.get(guild_id)
+    if index is not None:
+        index[kind].setdefault(name, obj_id)
+
+
+def _index_drop(guild_id, kind, name, obj_id):
+    index = GUILD_INDEX.get(guild_id)
+    if index is not None and index[kind].get(name) == obj_id:
+        # another channel/role may share the name; rebuild on next use
+        GUILD_INDEX.pop(guild_id, None)
+
+
+@bot.event
+@timed_event
+async def on_guild_channel_create(channel):
+    if isinstance(channel, discord.TextChannel):
+        _index_add(channel.guild.id, 0, channel.name, channel.id)
+
+
+@bot.event
+@timed_event
+async def on_guild_channel_delete(channel):
+    if isinstance(channel, discord.TextChannel):
+        _index_drop(channel.guild.id, 0, channel.name, channel.id)
+
+
+@bot.event
+@timed_event
+async def on_guild_channel_update(before, after):
+    if isinstance(after, discord.TextChannel) and before.name != after.name:
+        _index_drop(after.guild.id, 0, before.name, before.id)
+        _index_add(after.guild.id, 0, after.name, after.id)
+
+
+@bot.event
+@timed_event
+async def on_guild_role_create(role):
+    _index_add(role.guild.id, 1, role.name, role.id)
+
+
+@bot.event
+@timed_event
+async def on_guild_role_delete(role):
+    _index_drop(role.guild.id, 1, role.name, role.id)
+    invalidate_auth(role.guild.id)
+
+
+@bot.event
+@timed_event
+async def on_guild_role_update(before, after):
+    if before.name != after.name:
+        _index_drop(after.guild.id, 1, before.name, before.id)
+        _index_add(after.guild.id, 1, after.name, after.id)
+    if before.name != after.name or before.permissions != after.permissions:
+        invalidate_auth(after.guild.id)
+
+
+@bot.event
+@timed_event
+async def on_guild_remove(guild):
+    GUILD_INDEX.pop(guild.id, None)
+
+
+# Moderator authorization shared by every mod command, prefix and slash alike.
+# Decisions are cached per (guild, member) and tagged with the guild's auth
+# version: role edits and mod-role changes bump the version, member role
+# updates drop that member's entry. Members outside the member cache get no
+# updates, so their entries carry a snapshot of role ids to compare instead.
+AUTH_CACHE = {}        # (guild id, member id) -> (version, role ids or None, allowed)
+AUTH_CACHE_MAX = 50000
+AUTH_VERSIONS = {}     # guild id -> version
+
+
+class NotModerator(commands.CheckFailure, app_commands.CheckFailure):
+    pass
+
+
+def invalidate_auth(guild_id, member_id=None):
+    if member_id is None:
+        AUTH_VERSIONS[guild_id] = AUTH_VERSIONS.get(guild_id, 0) + 1
+    else:
+        AUTH_CACHE.pop((guild_id, member_id), None)
+
+
+def is_moderator(member):
+    guild = member.guild
+    key = (guild.id, member.id)
+    version = AUTH_VERSIONS.get(guild.id, 0)
+    # a cached member's entry is dropped by on_member_update, so only the others need
+    # Member.roles built on every check
+    roles = None if guild.get_member(member.id) is not None else tuple(role.id for role in member.roles)
+    cached = AUTH_CACHE.get(key)
+    if cached is not None and cached[0] == version and cached[1] == roles:
+        return cached[2]
+    perms = member.guild_permissions
+    allowed = perms.administrator or perms.manage_guild
+    if not allowed:
+        role = resolve_role(guild, get_guild_config(guild.id).get("mod_role"))
+        allowed = role is not None and member.get_role(role.id) is not None
+    if len(AUTH_CACHE) >= AUTH_CACHE_MAX:
+        AUTH_CACHE.clear()
+    AUTH_CACHE[key] = (version, roles, allowed)
+    return allowed
+
+
+def mod_only():
+    """Restrict a prefix or app command to admins, Manage Server holders and the configured mod role."""
+    async def prefix_predicate(ctx):
+        if ctx.guild is None:
+            raise commands.NoPrivateMessage()
+        if not is_moderator(ctx.author):
+            raise NotModerator()
+        return True
+
+    async def app_predicate(interaction):
+        if interaction.guild is None:
+            raise app_commands.NoPrivateMessage("This command must be used in a server.")
+        if not is_moderator(interaction.user):
+            raise NotModerator()
+        return True
+
+    def decorator(func):
+        commands.check(prefix_predicate)(func)
+        app_commands.check(app_predicate)(func)
+        return func
+
+    return decorator
+
+
+async def fetch_member(guild, user_id):
+    """Return a member from the cache, falling back to a REST fetch (None if they aren't in the guild)."""
+    member = guild.get_member(user_id)
+    if member is None:
+        try:
+            member = await guild.fetch_member(user_id)
+        except discord.NotFound:
+            return None
+        METRICS.inc("kevin_member_fetches_total")
+    return member
+
+
+class FetchMember(commands.MemberConverter):
+    """Member converter that fetches by ID or mention when the member isn't cached."""
+
+    async def convert(self, ctx, argument):
+        try:
+            return await super().convert(ctx, argument)
+        except (commands.MemberNotFound, discord.ClientException):
+            match = self._get_id_match(argument) or re.match(r"<@!?([0-9]{15,20})>$", argument)
+            member = await fetch_member(ctx.guild, int(match.group(1))) if match and ctx.guild else None
+            if member is None:
+                raise commands.MemberNotFound(argument)
+            return member
+
+
+@bot.event
+@timed_event
+async def on_member_update(before, after):
+    if before.roles != after.roles:
+        invalidate_auth(after.guild.id, after.id)
+
+
+@bot.event
+async def on_command_error(ctx, error):
+    if isinstance(error, NotModerator):
+        await ctx.send("You don't have permission to do that.")
+    elif isinstance(error, commands.NoPrivateMessage):
+        await ctx.send("This command must be used in a server.")
+    else:
+        await commands.Bot.on_command_error(bot, ctx, error)
+
+
+@bot.tree.error
+async def on_app_command_error(interaction, error):
+    if isinstance(error, NotModerator):
+        await interaction.response.send_message("You don't have permission.", ephemeral=True)
+    elif isinstance(error, app_commands.NoPrivateMessage):
+        await interaction.response.send_message("This command must be used in a server.", ephemeral=True)
+    else:
+        await app_commands.CommandTree.on_error(bot.tree, interaction, error)
+
+
+# Moderation log pipeline. log_action() only queues the entry; log_shipper()
+# flushes every guild's queue each LOG_FLUSH_INTERVAL seconds (sooner once a
+# queue reaches LOG_BATCH_SIZE), coalescing entries into paged embeds so a raid
+# cleanup costs a handful of messages instead of one per action.
+LOG_FLUSH_INTERVAL = 2.0
+LOG_BATCH_SIZE = 20
+LOG_QUEUE_MAX = 1000         # per guild; the oldest entries are dropped beyond this
+LOG_PAGES_PER_MESSAGE = 3
+LOG_TITLE_CHARS = 32         # room for "Moderation log (i/n)"
+# Discord caps a message's embeds at 6000 characters in total, titles included
+LOG_PAGE_CHARS = 6000 // LOG_PAGES_PER_MESSAGE - LOG_TITLE_CHARS
+LOG_QUEUES = {}
+_log_flush_event = None
+
+
+async def log_action(guild, description: str):
+    cfg = get_guild_config(guild.id)
+    if not cfg.get("log_channel"):
+        return
+    queue = LOG_QUEUES.get(guild.id)
+    if queue is None:
+        queue = LOG_QUEUES[guild.id] = deque(maxlen=LOG_QUEUE_MAX)
+    queue.append(f"<t:{int(time.time())}:T> {description}")
+    if len(queue) >= LOG_BATCH_SIZE and _log_flush_event is not None:
+        _log_flush_event.set()
+
+
+def _log_pages(lines):
+    pages, page, size = [], [], 0
+    for line in lines:
+        line = line[:LOG_PAGE_CHARS]
+        if page and size + len(line) + 1 > LOG_PAGE_CHARS:
+            pages.append("\n".join(page))
+            page, size = [], 0
+        page.append(line)
+        size += len(line) + 1
+    if page:
+        pages.append("\n".join(page))
+    return pages
+
+
+async def _ship_log(guild_id, lines):
+    guild = bot.get_guild(guild_id)
+    if guild is None:
+        return
+    channel = resolve_channel(guild, get_guild_config(guild_id).get("log_channel"))
+    if not channel:
+        return
+    pages = _log_pages(lines)
+    embeds = [
+        discord.Embed(title=f"Moderation log ({i}/{len(pages)})", description=page, color=discord.Color.orange())
+        for i, page in enumerate(pages, 1)
+    ]
+    for i in range(0, len(embeds), LOG_PAGES_PER_MESSAGE):
+        try:
+            await OUTBOX.send(channel, embeds=embeds[i:i + LOG_PAGES_PER_MESSAGE], priority=PRIORITY_LOG)
+        except (discord.Forbidden, discord.NotFound) as e:
+            log(f"Failed to send moderation log to #{channel.name} ({guild_id}): {e}")
+            return
+        except Exception as e:
+            # one rejected message shouldn't cost the rest of the batch
+            log(f"Failed to send moderation log to #{channel.name} ({guild_id}): {e}")
+
+
+async def log_shipper():
+    global _log_flush_event
+    _log_flush_event = asyncio.Event()
+    while True:
+        try:
+            await asyncio.wait_for(_log_flush_event.wait(), LOG_FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _log_flush_event.clear()
+        batches = [(guild_id, LOG_QUEUES.pop(guild_id)) for guild_id in list(LOG_QUEUES) if LOG_QUEUES[guild_id]]
+        if batches:
+            # guilds ship concurrently so one slow channel doesn't hold up the rest
+            await asyncio.gather(*(_ship_log(guild_id, list(lines)) for guild_id, lines in batches))
+
+
+@bot.command()
+async def ping(ctx):
+    latency = round(bot.latency * 1000)
+    await ctx.send(f"Pong! {latency}ms")
+
+
+@bot.tree.command(name="ping")
+async def slash_ping(interaction: discord.Interaction):
+    latency = round(bot.latency * 1000)
+    await interaction.response.send_message(f"Pong! {latency}ms")
+
+
+# Dice engine. An expression is a sum of dice terms and constants, e.g.
+# 4d6kh3+2d8!-1d4+5. Small rolls list every die; above DICE_LIST_LIMIT dice a
+# term is rolled as per-face counts (a multinomial drawn as a chain of binomials)
+# so a million dice cost a handful of draws instead of a million. Exact outcome
+# distributions for "roll stats" are computed with integer weights and cached.
+DICE_LIST_LIMIT = 100          # dice shown individually per message
+DICE_DIRECT_LIMIT = 10000      # above this, face counts are drawn as binomials
+DICE_COUNTS_MAX_SIDES = 1000   # larger dice fall back to a normal approximation of the sum
+DICE_MAX_COUNT = 10_000_000
+DICE_MAX_SIDES = 1_000_000
+DICE_MAX_TERMS = 20
+DICE_EXPLODE_DEPTH = 10        # an exploding die rerolls at most this many times in a row
+DICE_STATS_MAX_WORK = 10_000_000   # budgeted multiply-adds for roll stats (roughly 0.5s)
+DICE_STATS_MAX_WIDTH = 100_000     # distinct totals roll stats will tabulate
+
+DICE_TERM_RE = re.compile(r"\s*([+-])?\s*(?:(\d*)d(\d+)(!?)(?:(kh|kl|dh|dl|k)(\d+))?|(\d+))\s*")
+
+
+class DiceError(ValueError):
+    pass
+
+
+class DiceTerm:
+    __slots__ = ("sign", "count", "sides", "explode", "keep", "keep_high", "text")
+
+    def __init__(self, sign, count, sides, explode=False, keep=None, keep_high=True, text=""):
+        self.sign = sign
+        self.count = count
+        self.sides = sides
+        self.explode = explode
+        self.keep = keep            # number of dice that count; None keeps them all
+        self.keep_high = keep_high
+        self.text = text
+
+    @property
+    def key(self):
+        return self.count, self.sides, self.explode, self.keep, self.keep_high
+
+
+def parse_dice(text):
+    """Parse a dice expression into ``(terms, modifier)``; raises DiceError."""
+    text = text.strip().lower() or "1d6"
+    terms, modifier, pos, total = [], 0, 0, 0
+    while pos < len(text):
+        m = DICE_TERM_RE.match(text, pos)
+        if m is None or m.end() == pos:
+            raise DiceError(f"Couldn't read `{text[pos:]}`")
+        if pos and not m.group(1):
+            raise DiceError(f"Expected + or - before `{text[pos:].strip()}`")
+        pos = m.end()
+        sign = -1 if m.group(1) == "-" else 1
+        if m.group(7) is not None:
+            modifier += sign * int(m.group(7))
+            continue
+        count, sides, explode = int(m.group(2) or 1), int(m.group(3)), bool(m.group(4))
+        if not 1 <= count <= DICE_MAX_COUNT or not 1 <= sides <= DICE_MAX_SIDES:
+            raise DiceError(f"Use 1-{DICE_MAX_COUNT:,} dice with 1-{DICE_MAX_SIDES:,} sides")
+        if explode and sides < 2:
+            raise DiceError("Only dice with at least 2 sides can explode")
+        keep, keep_high = None, True
+        if m.group(5):
+            n = int(m.group(6))
+            op = m.group(5)
+            keep, keep_high = (n, op != "kl") if op in ("k", "kh", "kl") else (count - n, op == "dl")
+            if not 0 < keep <= count:
+                raise DiceError(f"`{m.group(0).strip()}` keeps no dice")
+            if keep == count:
+                keep = None
+        total += count
+        terms.append(DiceTerm(sign, count, sides, explode, keep, keep_high, text=m.group(0).strip().lstrip("+-")))
+    if not terms:
+        raise DiceError("Roll at least one die")
+    if len(terms) > DICE_MAX_TERMS or total > DICE_MAX_COUNT:
+        raise DiceError(f"At most {DICE_MAX_TERMS} terms and {DICE_MAX_COUNT:,} dice per roll")
+    return terms, modifier
+
+
+_binomialvariate = getattr(random, "binomialvariate", None)  # Python 3.12+
+
+
+def _binomial(n, p):
+    if _binomialvariate is not None:
+        return _binomialvariate(n, p)
+    # only reached for n > DICE_DIRECT_LIMIT and p >= 1/DICE_COUNTS_MAX_SIDES, where this is very close
+    return min(n, max(0, round(random.gauss(n * p, (n * p * (1 - p)) ** 0.5))))
+
+
+def face_counts(n, sides):
+    """How many of ``n`` dice landed on each face (index 0 is a 1)."""
+    counts = [0] * sides
+    remaining = n
+    for face in range(sides):
+        if remaining <= DICE_DIRECT_LIMIT:
+            for value, c in Counter(random.choices(range(face, sides), k=remaining)).items():
+                counts[value] += c
+            break
+        c = remaining if face == sides - 1 else _binomial(remaining, 1 / (sides - face))
+        counts[face] = c
+        remaining -= c
+    return counts
+
+
+def _roll_listed(term):
+    rolls = []
+    for _ in range(term.count):
+        value = roll = random.randint(1, term.sides)
+        for _ in range(DICE_EXPLODE_DEPTH - 1):
+            if not term.explode or roll != term.sides:
+                break
+            roll = random.randint(1, term.sides)
+            value += roll
+        rolls.append(value)
+    kept = set(range(len(rolls)))
+    if term.keep is not None:
+        order = sorted(kept, key=rolls.__getitem__, reverse=term.keep_high)
+        kept = set(order[:term.keep])
+    shown = ", ".join(str(v) if i in kept else f"~~{v}~~" for i, v in enumerate(rolls))
+    return sum(rolls[i] for i in kept), f"[{shown}]"
+
+
+def _roll_counted(term):
+    n, sides = term.count, term.sides
+    if sides > DICE_COUNTS_MAX_SIDES:
+        if term.keep is not None or term.explode:
+            raise DiceError(f"Keep/drop and exploding dice are limited to d{DICE_COUNTS_MAX_SIDES} above "
+                            f"{DICE_LIST_LIMIT} dice")
+        mean, var = n * (sides + 1) / 2, n * (sides * sides - 1) / 12
+        total = min(n * sides, max(n, round(random.gauss(mean, var ** 0.5))))
+        return total, n
+    counts = face_counts(n, sides)
+    if term.explode:
+        if term.keep is not None:
+            raise DiceError(f"Keep/drop can't be combined with exploding dice above {DICE_LIST_LIMIT} dice")
+        total = sum((face + 1) * c for face, c in enumerate(counts))
+        again = counts[-1]
+        for _ in range(DICE_EXPLODE_DEPTH - 1):
+            if not again:
+                break
+            extra = face_counts(again, sides)
+            total += sum((face + 1) * c for face, c in enumerate(extra))
+            again = extra[-1]
+        return total, n
+    keep = n if term.keep is None else term.keep
+    faces = range(sides - 1, -1, -1) if term.keep_high else range(sides)
+    total = 0
+    left = keep
+    for face in faces:
+        take = min(left, counts[face])
+        total += (face + 1) * take
+        left -= take
+        if not left:
+            break
+    return total, keep
+
+
+def roll_dice(text):
+    """Roll an expression; returns ``(total, breakdown)``."""
+    terms, modifier = parse_dice(text)
+    grand, parts, listed = modifier, [], 0
+    for term in terms:
+        if listed + term.count <= DICE_LIST_LIMIT:
+            listed += term.count
+            total, shown = _roll_listed(term)
+        else:
+            total, kept = _roll_counted(term)
+            shown = f"{total:,} (avg {total / kept:.2f} over {kept:,} dice)"
+        grand += term.sign * total
+        parts.append(f"{'-' if term.sign < 0 else '+'} {term.text} {shown}")
+    if modifier:
+        parts.append(f"{'-' if modifier < 0 else '+'} {abs(modifier)}")
+    return grand, " ".join(parts).lstrip("+ ")
+
+
+def _die_weights(sides, explode):
+    """Integer weights for one die's value; an exploding die is cut off at DICE_EXPLODE_DEPTH rolls."""
+    if not explode:
+        return {face: 1 for face in range(1, sides + 1)}
+    depth = DICE_EXPLODE_DEPTH
+    weights = {}
+    for j in range(depth):
+        for face in range(1, sides):
+            weights[sides * j + face] = sides ** (depth - j - 1)
+    weights[sides * depth] = 1
+    return weights
+
+
+def _convolve(a, b):
+    """Convolve two (offset, weights) distributions."""
+    (oa, wa), (ob, wb) = a, b
+    out = [0] * (len(wa) + len(wb) - 1)
+    for i, x in enumerate(wa):
+        if x:
+            for j, y in enumerate(wb):
+                out[i + j] += x * y
+    return oa + ob, out
+
+
+def term_cost(count, sides, explode, keep):
+    """``(width, work, bits)`` of term_distribution, worked out without building anything.
+
+    ``width`` is the length of the weight list, ``work`` the number of big-int
+    multiply-adds needed and ``bits`` roughly the size of the largest weight.
+    """
+    depth = DICE_EXPLODE_DEPTH if explode else 1
+    top = sides * depth
+    faces = depth * (sides - 1) + 1 if explode else sides
+    bits = count * (sides ** depth).bit_length()
+    if keep is None:
+        # count - 1 convolutions of a growing list with one die's ``top`` weights
+        return count * (top - 1) + 1, top * ((top - 1) * count * (count - 1) // 2 + count - 1), bits
+    # the keep/drop DP: per face value, (dice used, kept total) states times dice placed;
+    # its dict updates cost about four list multiply-adds each
+    return keep * top + 1, 4 * faces * count * count * keep * top, bits
+
+
+@functools.lru_cache(maxsize=256)
+def term_distribution(count, sides, explode, keep, keep_high):
+    """Exact distribution of one term as ``(lowest total, weights)``; callers check term_cost first."""
+    die = _die_weights(sides, explode)
+    values = sorted(die)
+    if keep is None:
+        single = (values[0], [die.get(v, 0) for v in range(values[0], values[-1] + 1)])
+        dist = single
+        for _ in range(count - 1):
+            dist = _convolve(dist, single)
+        return dist
+    # Assign dice to values from the kept end inwards; the first ``keep`` dice
+    # assigned are the kept ones. State: (dice assigned, kept total) -> weight.
+    states = {(0, 0): 1}
+    for v in (reversed(values) if keep_high else values):
+        w = die[v]
+        nxt = {}
+        for (used, kept_sum), weight in states.items():
+            ways, power = weight, 1
+            for c in range(count - used + 1):
+                if c:
+                    ways = ways * (count - used - c + 1) // c
+                    power *= w
+                took = min(c, max(keep - used, 0))
+                key = (used + c, kept_sum + took * v)
+                nxt[key] = nxt.get(key, 0) + ways * power
+        states = nxt
+    totals = {s: weight for (used, s), weight in states.items() if used == count}
+    low = min(totals)
+    return low, [totals.get(t, 0) for t in range(low, max(totals) + 1)]
+
+
+@functools.lru_cache(maxsize=256)
+def dice_distribution(text):
+    terms, modifier = parse_dice(text)
+    # Budget the whole computation up front: every convolution costs output width
+    # x input width multiply-adds, each scaled by the size of the numbers involved.
+    work, width, bits = 0, 1, 0
+    for term in terms:
+        term_width, term_work, term_bits = term_cost(*term.key[:4])
+        bits += term_bits
+        work += (term_work + width * term_width) * (bits // 64 + 1)
+        width += term_width - 1
+        if work > DICE_STATS_MAX_WORK or width > DICE_STATS_MAX_WIDTH:
+            raise DiceError("That roll is too large for exact stats")
+    dist = (modifier, [1])
+    for term in terms:
+        low, weights = term_distribution(*term.key)
+        if term.sign < 0:
+            low, weights = -(low + len(weights) - 1), weights[::-1]
+        dist = _convolve(dist, (low, weights))
+    return dist
+
 
-log = logger.info
+def dice_stats(text):
+    """Summary of the exact outcome distribution (CPU-bound; run it off the event loop)."""
+    low, weights = dice_distribution(text.strip().lower() or "1d6")
+    total = sum(weights)
+    try:
+        # int / int stays exact until the result, so huge weights never meet a float
+        probs = [w / total for w in weights]
+        mean = sum((low + i) * p for i, p in enumerate(probs))
+        var = sum((low + i - mean) ** 2 * p for i, p in enumerate(probs))
+    except OverflowError:
+        raise DiceError("That roll is too large for exact stats") from None
+    mode = max(range(len(weights)), key=weights.__getitem__)
 
-# Simple config storage (from Ron)
-CONFIG_PATH = ROOT / "configs.json"
+    def percentile(pct):
+        acc = 0
+        for i, w in enumerate(weights):
+            acc += w
+            if acc * 100 >= pct * total:
+                return low + i
+        return low + len(weights) - 1
+
+    nonzero = [i for i, w in enumerate(weights) if w]
+    return (f"mean {mean:.2f}, sd {var ** 0.5:.2f}, range {low + nonzero[0]}–{low + nonzero[-1]}\n"
+            f"median {percentile(50)}, most likely {low + mode} ({probs[mode]:.2%}), "
+            f"90% of rolls between {percentile(5)} and {percentile(95)}")
 
-DEFAULT_PREFIX = os.getenv("PREFIX", "?")  # user's request: new prefix is '?'
 
-if CONFIG_PATH.exists():
+DICE_USAGE = "Usage: {p}roll 2d6, 4d6kh3+2, 3d10!, 1000000d6 or {p}roll stats 4d6kh3"
+
+
+@bot.command()
+async def roll(ctx, *, dice: str = "1d6"):
+    """Roll a dice expression, or show its outcome distribution with ``roll stats``."""
     try:
-        CONFIGS = json.loads(CONFIG_PATH.read_text())
-    except Exception:
-        CONFIGS = {}
-else:
-    CONFIGS = {}
+        if dice.lower().startswith("stats"):
+            expr = dice[5:].strip() or "1d6"
+            await ctx.send(f"📊 {expr}: {await asyncio.to_thread(dice_stats, expr)}")
+            return
+        total, breakdown = roll_dice(dice)
+    except DiceError as e:
+        await ctx.send(f"{e}. " + DICE_USAGE.format(p=ctx.clean_prefix))
+        return
+    await ctx.send(f"🎲 {breakdown} = **{total:,}**"[:2000])
 
 
-def save_configs():
+@bot.tree.command(name="roll")
+@app_commands.describe(dice="Dice expression, e.g. 2d6, 4d6kh3+2 or 3d10!",
+                       stats="Show the exact outcome distribution instead of rolling")
+async def slash_roll(interaction: discord.Interaction, dice: str = "1d6", stats: bool = False):
     try:
-        CONFIG_PATH.write_text(json.dumps(CONFIGS, indent=2))
-    except Exception as e:
-        log(f"Failed to save configs: {e}")
+        if stats:
+            await interaction.response.send_message(f"📊 {dice}: {await asyncio.to_thread(dice_stats, dice)}")
+            return
+        total, breakdown = roll_dice(dice)
+    except DiceError as e:
+        await interaction.response.send_message(f"{e}. " + DICE_USAGE.format(p="/"), ephemeral=True)
+        return
+    await interaction.response.send_message(f"🎲 {breakdown} = **{total:,}**"[:2000])
 
 
-def get_guild_config(guild_id: int):
-    # configuration per guild; new fields may be added over time
-    return CONFIGS.setdefault(str(guild_id), {
-        "prefix": DEFAULT_PREFIX,
-        "mod_role": None,
-        "log_channel": None,
-        "welcome_channel": None,
-        # added for enhanced config
-        "timezone": None,                  # e.g. "UTC", "America/New_York"
-        "reminder_channel": None,          # default channel name for reminders
-        "aliases": {},                     # custom command aliases
-    })
-
-
-# Intents
-intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
+# Per-guild quote store. Quotes live in the shared SQLite store with an FTS5
+# index for search; the guild is an indexed token in the same FTS row, so a
+# search only walks that guild's postings. Each guild's quotes occupy dense
+# slots 0..n-1 (removal moves the last quote into the gap), so a random quote
+# is two index lookups however many quotes there are.
+class QuoteStore:
+    SEARCH_LIMIT = 10
+    MAX_LENGTH = 1000
 
+    def __init__(self, store):
+        self.store = store
+        self.store.script("""
+            CREATE TABLE IF NOT EXISTS quotes (
+                id INTEGER PRIMARY KEY,
+                guild_id INTEGER NOT NULL,
+                slot INTEGER NOT NULL,
+                content TEXT NOT NULL,
+                author TEXT,
+                added_by INTEGER,
+                created REAL NOT NULL
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS quotes_guild_slot ON quotes (guild_id, slot);
+            CREATE VIRTUAL TABLE IF NOT EXISTS quotes_fts USING fts5(content, guild);
+        """)
 
-async def determine_prefix(bot, message):
-    if message.guild:
-        cfg = get_guild_config(message.guild.id)
-        return commands.when_mentioned_or(cfg.get("prefix", DEFAULT_PREFIX))(bot, message)
-    return commands.when_mentioned_or(DEFAULT_PREFIX)(bot, message)
+    def add(self, guild_id, content, author=None, added_by=None):
+        with self.store.transaction() as conn:
+            slot = conn.execute("SELECT COALESCE(MAX(slot) + 1, 0) FROM quotes WHERE guild_id = ?",
+                                (guild_id,)).fetchone()[0]
+            quote_id = conn.execute(
+                "INSERT INTO quotes (guild_id, slot, content, author, added_by, created) VALUES (?, ?, ?, ?, ?, ?)",
+                (guild_id, slot, content, author, added_by, time.time())).lastrowid
+            conn.execute("INSERT INTO quotes_fts (rowid, content, guild) VALUES (?, ?, ?)",
+                         (quote_id, content, f"g{guild_id}"))
+        return quote_id
 
+    def get(self, guild_id, quote_id):
+        rows = self.store.query("SELECT id, content, author, added_by FROM quotes WHERE id = ? AND guild_id = ?",
+                                (quote_id, guild_id))
+        return rows[0] if rows else None
 
-bot = commands.Bot(command_prefix=determine_prefix, intents=intents, description="Kevin - merged with Ron")
+    def remove(self, guild_id, quote_id):
+        with self.store.transaction() as conn:
+            row = conn.execute("SELECT slot FROM quotes WHERE id = ? AND guild_id = ?", (quote_id, guild_id)).fetchone()
+            if row is None:
+                return False
+            last = conn.execute("SELECT MAX(slot) FROM quotes WHERE guild_id = ?", (guild_id,)).fetchone()[0]
+            conn.execute("DELETE FROM quotes WHERE id = ?", (quote_id,))
+            conn.execute("DELETE FROM quotes_fts WHERE rowid = ?", (quote_id,))
+            if row[0] != last:
+                conn.execute("UPDATE quotes SET slot = ? WHERE guild_id = ? AND slot = ?", (row[0], guild_id, last))
+        return True
 
-# intercept messages to process custom aliases
-@bot.event
-async def on_message(message):
-    # preserve normal behavior for bots and DMs
-    if message.author.bot or not message.guild:
-        await bot.process_commands(message)
+    def count(self, guild_id):
+        return self.store.query("SELECT COALESCE(MAX(slot) + 1, 0) FROM quotes WHERE guild_id = ?", (guild_id,))[0][0]
+
+    def random(self, guild_id):
+        # another worker may remove a quote between the two lookups, so retry a couple of times
+        for _ in range(3):
+            n = self.count(guild_id)
+            if not n:
+                return None
+            rows = self.store.query("SELECT id, content, author, added_by FROM quotes WHERE guild_id = ? AND slot = ?",
+                                    (guild_id, random.randrange(n)))
+            if rows:
+                return rows[0]
+        return None
+
+    def search(self, guild_id, text, limit=SEARCH_LIMIT):
+        """Newest quotes containing every word of ``text`` (the last word may be a prefix)."""
+        words = re.findall(r"\w+", text)
+        if not words:
+            return []
+        terms = " ".join(f'"{w}"' for w in words) + "*"
+        return self.store.query(
+            "SELECT q.id, q.content, q.author, q.added_by FROM quotes_fts f JOIN quotes q ON q.id = f.rowid "
+            "WHERE quotes_fts MATCH ? ORDER BY f.rowid DESC LIMIT ?",
+            (f"guild:g{guild_id} AND content:({terms})", limit))
+
+
+QUOTE_STORE = QuoteStore(STORE)
+QUOTE_USAGE = "Usage: {p}quote [id] | {p}quote add <text> (or reply to a message) | {p}quote remove <id> | {p}quote search <words>"
+
+
+def format_quote(row):
+    quote_id, content, author, _ = row
+    return f"#{quote_id}: {content}" + (f" — {author}" if author else "")
+
+
+@bot.group(invoke_without_command=True)
+async def quote(ctx, quote_id: int = None):
+    """Send a random quote from this server (or quote number ``quote_id``)."""
+    if ctx.guild is None:
+        await ctx.send(random.choice(QUOTES))
         return
+    row = QUOTE_STORE.random(ctx.guild.id) if quote_id is None else QUOTE_STORE.get(ctx.guild.id, quote_id)
+    if row is not None:
+        await ctx.send(format_quote(row))
+    elif quote_id is not None:
+        await ctx.send(f"No quote #{quote_id} here.")
+    else:
+        await ctx.send(random.choice(QUOTES))
 
-    cfg = get_guild_config(message.guild.id)
-    aliases = cfg.get("aliases", {}) or {}
-    prefix = cfg.get("prefix", DEFAULT_PREFIX)
-    for alias, expansion in aliases.items():
-        if message.content.startswith(prefix + alias):
-            # rewrite the command portion and leave remainder intact
-            suffix = message.content[len(prefix + alias):]
-            message.content = prefix + expansion + suffix
-            break
 
-    await bot.process_commands(message)
-try:
-    bot.remove_command('help')
-except Exception:
-    pass
+@quote.command(name="add")
+@commands.guild_only()
+async def quote_add(ctx, *, text: str = None):
+    """Save a quote; reply to a message to quote it with its author."""
+    author = None
+    ref = ctx.message.reference
+    if ref is not None and ref.message_id:
+        quoted = ref.resolved
+        if not isinstance(quoted, discord.Message):
+            try:
+                quoted = await ctx.channel.fetch_message(ref.message_id)
+            except discord.HTTPException:  # deleted, or in a channel we can't read
+                await ctx.send(QUOTE_USAGE.format(p=ctx.clean_prefix))
+                return
+        text, author = text or quoted.content, quoted.author.display_name
+    if not text:
+        await ctx.send(QUOTE_USAGE.format(p=ctx.clean_prefix))
+        return
+    if len(text) > QuoteStore.MAX_LENGTH:
+        await ctx.send(f"Quotes can be at most {QuoteStore.MAX_LENGTH} characters.")
+        return
+    quote_id = QUOTE_STORE.add(ctx.guild.id, text, author=author, added_by=ctx.author.id)
+    await ctx.send(f"Saved quote #{quote_id}.")
 
-# Some utilities
-QUOTES = [
-    "Be kind. Be curious. - Ron",
-    "Small steps every day.",
-    "Don't forget to take breaks!",
-    "Code, test, iterate."
-]
 
+@quote.command(name="remove")
+@commands.guild_only()
+async def quote_remove(ctx, quote_id: int):
+    """Remove a quote (moderators, or whoever added it)."""
+    row = QUOTE_STORE.get(ctx.guild.id, quote_id)
+    if row is None:
+        await ctx.send(f"No quote #{quote_id} here.")
+        return
+    if row[3] != ctx.author.id and not is_moderator(ctx.author):
+        await ctx.send("Only moderators or the person who added a quote can remove it.")
+        return
+    QUOTE_STORE.remove(ctx.guild.id, quote_id)
+    await ctx.send(f"Removed quote #{quote_id}.")
 
-# DM functionality has been removed; the ALLOWED_DM_USER_ID setting is no longer used.
 
+@quote.command(name="search")
+@commands.guild_only()
+async def quote_search(ctx, *, words: str):
+    """List the newest quotes containing all of ``words``."""
+    rows = await asyncio.to_thread(QUOTE_STORE.search, ctx.guild.id, words)
+    if not rows:
+        await ctx.send("No matching quotes.")
+        return
+    await ctx.send("\n".join(format_quote(row)[:180] for row in rows))
 
-async def log_action(guild, description: str):
-    cfg = get_guild_config(guild.id)
-    ch_name = cfg.get("log_channel")
-    if not ch_name:
+
+@bot.tree.command(name="quote")
+@app_commands.describe(quote_id="Quote number (random if omitted)")
+async def slash_quote(interaction: discord.Interaction, quote_id: int = None):
+    if interaction.guild is None:
+        await interaction.response.send_message(random.choice(QUOTES))
         return
-    channel = discord.utils.get(guild.text_channels, name=ch_name)
-    if not channel:
+    gid = interaction.guild.id
+    row = QUOTE_STORE.random(gid) if quote_id is None else QUOTE_STORE.get(gid, quote_id)
+    if row is not None:
+        await interaction.response.send_message(format_quote(row))
+    elif quote_id is not None:
+        await interaction.response.send_message(f"No quote #{quote_id} here.", ephemeral=True)
+    else:
+        await interaction.response.send_message(random.choice(QUOTES))
+
+
+@bot.tree.command(name="quoteadd")
+@app_commands.describe(text="The quote", author="Who said it")
+@app_commands.guild_only()
+async def slash_quoteadd(interaction: discord.Interaction, text: app_commands.Range[str, 1, QuoteStore.MAX_LENGTH],
+                         author: str = None):
+    quote_id = QUOTE_STORE.add(interaction.guild.id, text, author=author, added_by=interaction.user.id)
+    await interaction.response.send_message(f"Saved quote #{quote_id}.")
+
+
+@bot.tree.command(name="quoteremove")
+@app_commands.describe(quote_id="Quote number to remove")
+@app_commands.guild_only()
+async def slash_quoteremove(interaction: discord.Interaction, quote_id: int):
+    row = QUOTE_STORE.get(interaction.guild.id, quote_id)
+    if row is None:
+        await interaction.response.send_message(f"No quote #{quote_id} here.", ephemeral=True)
         return
-    try:
-        await channel.send(description)
-    except Exception:
-        pass
+    if row[3] != interaction.user.id and not is_moderator(interaction.user):
+        await interaction.response.send_message("Only moderators or the person who added a quote can remove it.",
+                                                ephemeral=True)
+        return
+    QUOTE_STORE.remove(interaction.guild.id, quote_id)
+    await interaction.response.send_message(f"Removed quote #{quote_id}.", ephemeral=True)
 
 
-@bot.command()
-async def ping(ctx):
-    latency = round(bot.latency * 1000)
-    await ctx.send(f"Pong! {latency}ms")
+@bot.tree.command(name="quotesearch")
+@app_commands.describe(words="Words the quote must contain")
+@app_commands.guild_only()
+async def slash_quotesearch(interaction: discord.Interaction, words: str):
+    rows = await asyncio.to_thread(QUOTE_STORE.search, interaction.guild.id, words)
+    text = "\n".join(format_quote(row)[:180] for row in rows) if rows else "No matching quotes."
+    await interaction.response.send_message(text, ephemeral=True)
 
 
-@bot.tree.command(name="ping")
-async def slash_ping(interaction: discord.Interaction):
-    latency = round(bot.latency * 1000)
-    await interaction.response.send_message(f"Pong! {latency}ms")
+# Periodic random messages. Every guild with random messages enabled is one
+# entry in a shared heap driven by a single supervised task; settings live in
+# the guild config. Each guild's first post lands at a random point within its
+# interval, so guilds with the same interval are spread out rather than posting
+# together, and with randomauto on every gap (and message count) is re-drawn.
+RANDOM_MIN_INTERVAL = 5
+RANDOM_MAX_COUNT = 10
+
+
+class RandomMessageEngine:
+    MAX_SENDING = 20  # guilds posting at once
+
+    def __init__(self):
+        self.heap = []          # (fire time, guild id, generation)
+        self.generation = {}    # guild id -> generation of its live heap entry
+        self._generations = itertools.count(1)
+        self._wakeup = None
+        SUPERVISOR.set_limit("random-messages", self.MAX_SENDING)
+
+    def start(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        return SUPERVISOR.start("random-messages", self._run, owner="random-messages")
+
+    def schedule(self, guild_id, first=False):
+        """(Re)schedule a guild from its config; a disabled guild just drops its pending entry."""
+        cfg = get_guild_config(guild_id)
+        generation = next(self._generations)
+        interval = cfg.get("random_interval") or 0
+        if interval <= 0 or not cfg.get("random_channel"):
+            self.generation.pop(guild_id, None)
+            return
+        self.generation[guild_id] = generation
+        if first:
+            delay = random.uniform(0, interval)
+        elif cfg.get("random_auto"):
+            delay = interval * random.uniform(0.5, 1.5)
+        else:
+            delay = interval
+        entry = (time.time() + delay, guild_id, generation)
+        heapq.heappush(self.heap, entry)
+        if self._wakeup is not None and self.heap[0] == entry:
+            self._wakeup.set()
+
+    def scheduled(self, guild_id):
+        return guild_id in self.generation
+
+    def load(self):
+        """Schedule every guild on this worker that has random messages enabled (safe to repeat)."""
+        shard_sql, shard_params = shard_filter("CAST(guild_id AS INTEGER)")
+        rows = STORE.query(
+            "SELECT guild_id FROM guild_configs WHERE json_extract(data, '$.random_interval') > 0 "
+            f"AND {shard_sql}", shard_params)
+        for (guild_id,) in rows:
+            guild_id = int(guild_id)
+            if not self.scheduled(guild_id) and bot.get_guild(guild_id) is not None:
+                self.schedule(guild_id, first=True)
+
+    async def _send(self, guild_id):
+        guild = bot.get_guild(guild_id)
+        cfg = get_guild_config(guild_id)
+        channel = resolve_channel(guild, cfg.get("random_channel"))
+        if channel is None:
+            return
+        count = cfg.get("random_count") or 1
+        if cfg.get("random_auto"):
+            count = random.randint(1, count)
+        for i in range(count):
+            row = QUOTE_STORE.random(guild_id)
+            text = row[1] if row is not None else random.choice(QUOTES)
+            try:
+                await OUTBOX.send(channel, text, priority=PRIORITY_BULK)
+            except (discord.HTTPException, OutboxFull) as e:
+                log(f"Failed to send random message to #{channel.name} ({guild_id}): {e}")
+                return
+            METRICS.inc("kevin_random_messages_total")
+            log(f"Sent random message to #{channel.name}: {text}")
+            if i + 1 < count:
+                await asyncio.sleep(1)
+
+    async def _run(self):
+        while True:
+            now = time.time()
+            while self.heap and self.heap[0][0] <= now:
+                _, guild_id, generation = heapq.heappop(self.heap)
+                if self.generation.get(guild_id) != generation:
+                    continue  # settings changed since this entry was pushed
+                if bot.get_guild(guild_id) is None:
+                    self.generation.pop(guild_id, None)
+                    continue
+                self.schedule(guild_id)
+                await SUPERVISOR.spawn(self._send(guild_id), owner="random-messages")
+            self._wakeup.clear()
+            timeout = self.heap[0][0] - time.time() if self.heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+RANDOM_MESSAGES = RandomMessageEngine()
+
+
+def random_settings(guild):
+    cfg = get_guild_config(guild.id)
+    interval = cfg.get("random_interval") or 0
+    channel = cfg.get("random_channel")
+    state = f"every {interval}s in {describe_ref(channel, resolve_channel(guild, channel))}" if interval else "off"
+    return (f"Random messages: {state}\n"
+            f"Messages per interval: {'up to ' if cfg.get('random_auto') else ''}{cfg.get('random_count')}\n"
+            f"Automatic randomization: {'on' if cfg.get('random_auto') else 'off'}")
 
 
 @bot.command()
-async def roll(ctx, dice: str = "1d6"):
-    try:
-        if "d" not in dice:
-            raise ValueError
-        parts = dice.split("d")
-        n = int(parts[0]) if parts[0] != "" else 1
-        m = int(parts[1])
-        if n < 1 or m < 1 or n > 100:
-            raise ValueError
-    except Exception:
-        await ctx.send("Usage: !roll NdM (e.g. 2d6, d20). Max 100 dice.")
+@commands.guild_only()
+@commands.has_permissions(administrator=True)
+async def setrandominterval(ctx, seconds: int):
+    """Post random messages in this channel every ``seconds`` (0 turns them off)."""
+    if 0 < seconds < RANDOM_MIN_INTERVAL:
+        await ctx.send(f"The interval must be at least {RANDOM_MIN_INTERVAL} seconds (or 0 to turn random messages off).")
         return
-    rolls = [random.randint(1, m) for _ in range(n)]
-    total = sum(rolls)
-    await ctx.send(f"🎲 Rolled {dice}: {rolls} (total: {total})")
+    cfg = get_guild_config(ctx.guild.id)
+    cfg["random_interval"] = max(seconds, 0)
+    cfg["random_channel"] = ctx.channel.id
+    save_configs(ctx.guild.id)
+    RANDOM_MESSAGES.schedule(ctx.guild.id, first=True)
+    await ctx.send(f"Random messages every {seconds}s in {ctx.channel.mention}." if seconds > 0
+                   else "Random messages turned off.")
 
 
-@bot.tree.command(name="roll")
-@app_commands.describe(dice="Dice to roll in NdM format, e.g. 2d6")
-async def slash_roll(interaction: discord.Interaction, dice: str = "1d6"):
-    try:
-        if "d" not in dice:
-            raise ValueError
-        parts = dice.split("d")
-        n = int(parts[0]) if parts[0] != "" else 1
-        m = int(parts[1])
-        if n < 1 or m < 1 or n > 100:
-            raise ValueError
-    except Exception:
-        await interaction.response.send_message("Usage: /roll NdM (e.g. /roll 2d6). Max 100 dice.", ephemeral=True)
+@bot.command()
+@commands.guild_only()
+@commands.has_permissions(administrator=True)
+async def setrandomcount(ctx, count: int):
+    """Set how many random messages are posted each interval (1-10)."""
+    if not 1 <= count <= RANDOM_MAX_COUNT:
+        await ctx.send(f"The count must be between 1 and {RANDOM_MAX_COUNT}.")
         return
-    rolls = [random.randint(1, m) for _ in range(n)]
-    total = sum(rolls)
-    await interaction.response.send_message(f"🎲 Rolled {dice}: {rolls} (total: {total})")
+    get_guild_config(ctx.guild.id)["random_count"] = count
+    save_configs(ctx.guild.id)
+    await ctx.send(f"Up to {count} random message(s) per interval.")
 
 
 @bot.command()
-async def quote(ctx):
-    await ctx.send(random.choice(QUOTES))
+@commands.guild_only()
+@commands.has_permissions(administrator=True)
+async def randomauto(ctx, state: str):
+    """Turn randomized gaps and message counts on or off."""
+    if state.lower() not in ("on", "off"):
+        await ctx.send("Usage: randomauto on|off")
+        return
+    get_guild_config(ctx.guild.id)["random_auto"] = state.lower() == "on"
+    save_configs(ctx.guild.id)
+    await ctx.send(f"Automatic randomization {state.lower()}.")
 
 
-@bot.tree.command(name="quote")
-async def slash_quote(interaction: discord.Interaction):
-    await interaction.response.send_message(random.choice(QUOTES))
+@bot.command()
+@commands.guild_only()
+async def randomsettings(ctx):
+    """Show this server's random message settings."""
+    await ctx.send(random_settings(ctx.guild))
+
+
+def _is_admin(interaction):
+    return bool(getattr(interaction.user, "guild_permissions", None) and interaction.user.guild_permissions.administrator)
+
+
+@bot.tree.command(name="setrandominterval")
+@app_commands.describe(seconds="Seconds between random messages in this channel (0 turns them off)")
+@app_commands.guild_only()
+async def slash_setrandominterval(interaction: discord.Interaction, seconds: int):
+    if not _is_admin(interaction):
+        await interaction.response.send_message("You must be a server administrator to use this.", ephemeral=True)
+        return
+    if 0 < seconds < RANDOM_MIN_INTERVAL:
+        await interaction.response.send_message(
+            f"The interval must be at least {RANDOM_MIN_INTERVAL} seconds (or 0 to turn random messages off).",
+            ephemeral=True)
+        return
+    cfg = get_guild_config(interaction.guild.id)
+    cfg["random_interval"] = max(seconds, 0)
+    cfg["random_channel"] = interaction.channel.id
+    save_configs(interaction.guild.id)
+    RANDOM_MESSAGES.schedule(interaction.guild.id, first=True)
+    await interaction.response.send_message(
+        f"Random messages every {seconds}s in {interaction.channel.mention}." if seconds > 0
+        else "Random messages turned off.", ephemeral=True)
+
+
+@bot.tree.command(name="setrandomcount")
+@app_commands.describe(count="Random messages per interval (1-10)")
+@app_commands.guild_only()
+async def slash_setrandomcount(interaction: discord.Interaction, count: app_commands.Range[int, 1, RANDOM_MAX_COUNT]):
+    if not _is_admin(interaction):
+        await interaction.response.send_message("You must be a server administrator to use this.", ephemeral=True)
+        return
+    get_guild_config(interaction.guild.id)["random_count"] = count
+    save_configs(interaction.guild.id)
+    await interaction.response.send_message(f"Up to {count} random message(s) per interval.", ephemeral=True)
+
+
+@bot.tree.command(name="randomauto")
+@app_commands.describe(enabled="Randomize the gaps between messages and how many are sent")
+@app_commands.guild_only()
+async def slash_randomauto(interaction: discord.Interaction, enabled: bool):
+    if not _is_admin(interaction):
+        await interaction.response.send_message("You must be a server administrator to use this.", ephemeral=True)
+        return
+    get_guild_config(interaction.guild.id)["random_auto"] = enabled
+    save_configs(interaction.guild.id)
+    await interaction.response.send_message(f"Automatic randomization {'on' if enabled else 'off'}.", ephemeral=True)
+
+
+@bot.tree.command(name="randomsettings")
+@app_commands.guild_only()
+async def slash_randomsettings(interaction: discord.Interaction):
+    await interaction.response.send_message(random_settings(interaction.guild), ephemeral=True)
 
 
 # About command – provide information about Kevin’s capabilities
@@ -222,7 +2123,7 @@ async def about(ctx):
     embed.add_field(
         name="Commands",
         value=(
-            "`?remind` `?myreminders` `?ping` `?roll` `?quote` "
+            "`?remind` `?myreminders` `?snooze` `?cancelreminder` `?ping` `?roll` `?quote` "
             "`?purge` `?kick` `?ban` `?mute` `?unmute` `?config` "
             "`?about`"
         ),
@@ -271,7 +2172,7 @@ async def slash_about(interaction: discord.Interaction):
     embed.add_field(
         name="Commands",
         value=(
-            "`/remind` `/myreminders` `/ping` `/roll` `/quote` "
+            "`/remind` `/myreminders` `/snooze` `/cancelreminder` `/ping` `/roll` `/quote` "
             "`/purge` `/kick` `/ban` `/mute` `/unmute` `/config` "
             "`/about`"
         ),
@@ -297,141 +2198,1121 @@ async def slash_about(interaction: discord.Interaction):
     await interaction.response.send_message(embed=embed)
 
 
-# Simple remind (Ron style) — not the Kevin persistent system
-@bot.command()
-async def remind(ctx, minutes: float, *, message: str):
-    if minutes <= 0:
-        await ctx.send("Please provide a positive number of minutes.")
+# Recurring reminders. A schedule is a five-field cron expression or a natural
+# form ("every weekday 09:00", "every mon,thu 18:30", "every 2h"). Each distinct
+# schedule is compiled once and shared; the scheduler stores only the next
+# occurrence of a recurring reminder, so it costs the same as a one-shot.
+# Wall-clock times are evaluated in the reminder's zone (``tz:`` when it was set,
+# otherwise the guild's ``timezone``, otherwise UTC).
+MIN_REPEAT = 300            # shortest repeat interval, in seconds
+SCHEDULE_SEARCH_DAYS = 366 * 5
+REMIND_MAX_DELAY = SCHEDULE_SEARCH_DAYS * 86400  # furthest a reminder (or its repeat interval) may reach
+CRON_MONTHS = {name: i for i, name in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), 1)}
+WEEKDAY_NAMES = ("sunday", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday")
+CRON_WEEKDAYS = {key: i for i, name in enumerate(WEEKDAY_NAMES) for key in (name, name[:3])}
+NATURAL_DAYS = {"day": "*", "weekday": "1-5", "weekend": "0,6"}
+INTERVAL_WORDS = {"second": "s", "sec": "s", "minute": "m", "min": "m", "hour": "h", "day": "d", "week": "w"}
+CLOCK_RE = re.compile(r"([01]?\d|2[0-3]):([0-5]\d)")
+REMIND_USAGE = ("Usage: {p}remind <when> [tz:Area/City] <message>, where <when> is a delay (10m, 2h, 1d), "
+                "`every weekday 09:00`, `every mon,thu 18:30`, `every 2h` or `cron \"0 9 * * 1-5\"`.")
+
+
+@functools.lru_cache(maxsize=None)
+def get_zone(name):
+    """Cached ``ZoneInfo`` for ``name``; an empty name means UTC."""
+    if not name:
+        return timezone.utc
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise commands.BadArgument(f"Unknown time zone '{name}' (try UTC or America/New_York).") from None
+
+
+def _cron_value(token, names):
+    token = token.lower()
+    if token in names:
+        return names[token]
+    if not token.isdigit():
+        raise commands.BadArgument(f"Couldn't read '{token}' in the schedule.")
+    return int(token)
+
+
+def _cron_field(field, low, high, names=MappingProxyType({})):
+    values = set()
+    for part in field.split(","):
+        span, slash, step = part.partition("/")
+        if slash and not step.isdigit() or step == "0":
+            raise commands.BadArgument(f"Bad step in '{part}'.")
+        if span == "*":
+            start, end = low, high
+        elif "-" in span:
+            first, last = span.split("-", 1)
+            start, end = _cron_value(first, names), _cron_value(last, names)
+        else:
+            start = _cron_value(span, names)
+            end = high if slash else start
+        if not low <= start <= end <= high:
+            raise commands.BadArgument(f"'{part}' is out of range ({low}-{high}).")
+        values.update(range(start, end + 1, int(step) if slash else 1))
+    return frozenset(values)
+
+
+class Schedule:
+    """A compiled recurrence. ``next_after(ts, zone)`` is the first fire time after ``ts``."""
+    __slots__ = ("text", "interval", "minutes", "hours", "days", "months", "weekdays", "any_day", "any_weekday")
+
+    def __init__(self, text, interval=0, cron=None):
+        self.text = text
+        self.interval = interval
+        if cron is None:
+            return
+        minute, hour, day, month, weekday = cron
+        self.minutes = sorted(_cron_field(minute, 0, 59))
+        self.hours = sorted(_cron_field(hour, 0, 23))
+        self.days = _cron_field(day, 1, 31)
+        self.months = _cron_field(month, 1, 12, CRON_MONTHS)
+        self.weekdays = frozenset(d % 7 for d in _cron_field(weekday, 0, 7, CRON_WEEKDAYS))
+        self.any_day = day == "*"
+        self.any_weekday = weekday == "*"
+
+    def _matches(self, day):
+        if day.month not in self.months:
+            return False
+        on_weekday = (day.weekday() + 1) % 7 in self.weekdays
+        if self.any_day:
+            return on_weekday
+        if self.any_weekday:
+            return day.day in self.days
+        return on_weekday or day.day in self.days  # cron ORs day-of-month and day-of-week
+
+    def next_after(self, ts, zone):
+        """Next fire time after ``ts``, or None if the schedule never fires again.
+
+        Candidates are local wall-clock times converted with fold=0: a time
+        skipped by a DST jump fires just after the jump, and a time repeated
+        when clocks go back fires once, on its first occurrence.
+        """
+        if self.interval:
+            return ts + self.interval
+        day = datetime.fromtimestamp(ts, zone).date()
+        for _ in range(SCHEDULE_SEARCH_DAYS):
+            if self._matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        at = datetime(day.year, day.month, day.day, hour, minute, tzinfo=zone).timestamp()
+                        if at > ts:
+                            return at
+            day += timedelta(days=1)
+        return None
+
+    def shortest_gap(self):
+        """Fewest seconds between two consecutive firings, ignoring DST shifts."""
+        if self.interval:
+            return self.interval
+        times = [hour * 60 + minute for hour in self.hours for minute in self.minutes]
+        # the wrap-around gap assumes the schedule may fire on consecutive days
+        return 60 * min([b - a for a, b in zip(times, times[1:])] + [1440 - times[-1] + times[0]])
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_schedule(text):
+    """Compile a cron expression or ``every ...`` phrase into a shared :class:`Schedule`."""
+    words = text.lower().split()
+    if len(words) == 5 and words[0] != "every":
+        return _check_repeat(Schedule(" ".join(words), cron=words))
+    if len(words) < 2 or words[0] != "every":
+        raise commands.BadArgument(f"Couldn't read '{text}' as a schedule.")
+    when = words[1:]
+    unit = INTERVAL_WORDS.get(when[-1].removesuffix("s")) if len(when) == 2 else None
+    if unit and when[0].replace(".", "", 1).isdigit():
+        when = [when[0] + unit]  # "every 5 minutes"
+    if len(when) == 1:
+        seconds = {"hour": 3600, "day": 86400, "week": 604800}.get(when[0]) or parse_duration(when[0])
+        if seconds > REMIND_MAX_DELAY:
+            raise commands.BadArgument(f"Recurring reminders must repeat at least every {REMIND_MAX_DELAY // 86400} days.")
+        return _check_repeat(Schedule(" ".join(words), interval=seconds))
+    if len(when) == 3 and when[1] == "at":
+        when = [when[0], when[2]]
+    clock = CLOCK_RE.fullmatch(when[-1]) if len(when) == 2 else None
+    if clock is None:
+        raise commands.BadArgument(f"Couldn't read '{text}' as a schedule (try `every weekday 09:00`).")
+    days = NATURAL_DAYS.get(when[0], when[0])
+    if days != "*":
+        names = [CRON_WEEKDAYS.get(d.removesuffix("s")) for d in days.split(",")] if days[0].isalpha() else None
+        if names is not None and None in names:
+            raise commands.BadArgument(f"Couldn't read '{when[0]}' as days of the week.")
+        days = ",".join(map(str, names)) if names is not None else days
+    cron = [str(int(clock.group(2))), str(int(clock.group(1))), "*", "*", days]
+    return _check_repeat(Schedule(f"every {when[0]} {when[1]}", cron=cron))
+
+
+def _check_repeat(schedule):
+    if schedule.shortest_gap() < MIN_REPEAT:
+        raise commands.BadArgument(f"Recurring reminders can repeat at most every {MIN_REPEAT // 60} minutes.")
+    return schedule
+
+
+def check_delay(delay):
+    """Return ``delay`` if it is a usable reminder delay, else raise commands.BadArgument."""
+    if delay <= 0:
+        raise commands.BadArgument("Please provide a positive delay.")
+    if delay > REMIND_MAX_DELAY:
+        raise commands.BadArgument(f"Reminders can be at most {REMIND_MAX_DELAY // 86400} days away.")
+    return delay
+
+
+def parse_reminder(text):
+    """Split ``remind`` input into ``(delay, schedule, zone name, message)``.
+
+    Exactly one of ``delay`` (seconds) and ``schedule`` is set.
+    """
+    words = text.split()
+    if not words:
+        raise commands.BadArgument("Tell me what to remind you about.")
+    head = words[0].lower()
+    delay = schedule = None
+    if head == "every":
+        if len(words) < 2:
+            raise commands.BadArgument("Say how often, e.g. `every day 09:00` or `every 2h`.")
+        # the phrase is two to four words long; take the longest that compiles
+        errors = []
+        for size in (4, 3, 2):
+            try:
+                schedule = compile_schedule(" ".join(words[:size]))
+            except commands.BadArgument as e:
+                errors.append(e)
+                continue
+            words = words[size:]
+            break
+        else:
+            # "every 1m" should explain the interval limit, anything else the phrase
+            interval = DURATION_RE.fullmatch(words[1].lower()) or words[1].replace(".", "", 1).isdigit()
+            raise errors[-1] if interval else errors[0]
+    elif head == "cron":
+        rest = text.strip()[4:].strip()
+        if rest[:1] in ("'", '"', "`"):
+            expr, _, rest = rest[1:].partition(rest[0])
+            words = rest.split()
+        else:
+            expr, words = " ".join(rest.split()[:5]), rest.split()[5:]
+        schedule = compile_schedule(expr)
+        if schedule.interval:
+            raise commands.BadArgument("Use `every <interval>` for interval schedules.")
+    else:
+        delay = check_delay(parse_duration(words[0]))
+        words = words[1:]
+    zone = None
+    if words and words[0].lower().startswith("tz:"):
+        zone = words[0][3:]
+        get_zone(zone)
+        words = words[1:]
+    if not words:
+        raise commands.BadArgument("Tell me what to remind you about.")
+    return delay, schedule, zone, " ".join(words)
+
+
+def reminder_zone(tz, guild_id):
+    """Zone for a reminder: its own ``tz``, else the guild's configured timezone, else UTC."""
+    for name in (tz, get_guild_config(guild_id).get("timezone") if guild_id else None):
+        if name:
+            try:
+                return get_zone(name)
+            except commands.BadArgument:
+                continue
+    return timezone.utc
+
+
+# Reminder scheduler: one heap of due times and one timer task for every pending
+# reminder. Reminders live in the store; only those due within HORIZON seconds
+# (capped at MAX_LOADED) are held in memory, so the pending count can grow into
+# the hundreds of thousands without growing the heap.
+class ReminderScheduler:
+    HORIZON = 3600
+    MAX_LOADED = 20000
+    MAX_INFLIGHT = 50
+
+    def __init__(self, store):
+        self.store = store
+        self.store.script("""
+            CREATE TABLE IF NOT EXISTS reminders (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                due REAL NOT NULL,
+                user_id INTEGER NOT NULL,
+                guild_id INTEGER,
+                channel_id INTEGER,
+                content TEXT NOT NULL,
+                created REAL NOT NULL,
+                schedule TEXT,
+                tz TEXT
+            );
+            CREATE INDEX IF NOT EXISTS reminders_due ON reminders (due, id);
+            CREATE INDEX IF NOT EXISTS reminders_user ON reminders (user_id, due, id);
+            CREATE INDEX IF NOT EXISTS reminders_guild ON reminders (guild_id, user_id);
+        """)
+        columns = {row[1] for row in self.store.query("PRAGMA table_info(reminders)")}
+        for column in ("schedule", "tz"):
+            if column not in columns:
+                self.store.execute(f"ALTER TABLE reminders ADD COLUMN {column} TEXT")
+        self.heap = []              # (due, id) for reminders loaded in memory
+        self.loaded = {}            # id -> row tuple
+        self.cursor = (0.0, 0)      # everything <= cursor is in the heap
+        self.lateness = deque(maxlen=1000)
+        self.fired = 0
+        self.count = self._count()  # rows in the store, kept current so gauges don't scan the table
+        self._wakeup = None
+        SUPERVISOR.set_limit("reminder-delivery", self.MAX_INFLIGHT)
+
+    def start(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        return SUPERVISOR.start("reminder-scheduler", self._run, owner="reminders")
+
+    def add(self, user_id, content, delay, guild_id=None, channel_id=None):
+        now = time.time()
+        return self._insert(now + delay, user_id, guild_id, channel_id, content, now)
+
+    def add_recurring(self, user_id, content, schedule, tz=None, guild_id=None, channel_id=None):
+        """Store a recurring reminder; returns ``(id, first due time)``."""
+        now = time.time()
+        due = schedule.next_after(now, reminder_zone(tz, guild_id))
+        if due is None:
+            raise commands.BadArgument(f"`{schedule.text}` never fires.")
+        return self._insert(due, user_id, guild_id, channel_id, content, now, schedule.text, tz), due
+
+    def _insert(self, due, user_id, guild_id, channel_id, content, now, schedule=None, tz=None):
+        cur = self.store.execute(
+            "INSERT INTO reminders (due, user_id, guild_id, channel_id, content, created, schedule, tz) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (due, user_id, guild_id, channel_id, content, now, schedule, tz),
+        )
+        rid = cur.lastrowid
+        self.count += 1
+        if (due, rid) <= self.cursor:
+            self._load((rid, due, user_id, guild_id, channel_id, content, schedule, tz))
+        return rid
+
+    def list_for(self, user_id, after=None, limit=10):
+        """A page of a user's reminders ordered by due time, starting after the ``(due, id)`` cursor."""
+        due, rid = after or (0.0, 0)
+        return self.store.query(
+            "SELECT id, due, guild_id, content, schedule, tz FROM reminders "
+            "WHERE user_id = ? AND (due, id) > (?, ?) ORDER BY due, id LIMIT ?",
+            (user_id, due, rid, limit),
+        )
+
+    def cancel(self, user_id, ids):
+        """Delete the given reminders that belong to ``user_id``; returns the ids removed."""
+        with self.store.transaction() as conn:
+            removed = [rid for rid in ids
+                       if conn.execute("DELETE FROM reminders WHERE id = ? AND user_id = ?", (rid, user_id)).rowcount]
+        self.count -= len(removed)
+        for rid in removed:
+            self.loaded.pop(rid, None)  # its heap entry is skipped when it comes up
+        return removed
+
+    def cancel_all(self, user_id, guild_id=None):
+        if guild_id is None:
+            rows = self.store.query("SELECT id FROM reminders WHERE user_id = ?", (user_id,))
+        else:
+            rows = self.store.query("SELECT id FROM reminders WHERE guild_id = ? AND user_id = ?", (guild_id, user_id))
+        return self.cancel(user_id, [row[0] for row in rows])
+
+    def snooze(self, user_id, rid, delay):
+        """Push one of ``user_id``'s reminders back by ``delay`` seconds; returns the new due time or None."""
+        with self.store.transaction() as conn:
+            row = conn.execute(
+                "SELECT id, due, user_id, guild_id, channel_id, content, schedule, tz FROM reminders "
+                "WHERE id = ? AND user_id = ?", (rid, user_id),
+            ).fetchone()
+            if row is None:
+                return None
+            due = row[1] + delay
+            conn.execute("UPDATE reminders SET due = ? WHERE id = ?", (due, rid))
+        # only the worker that holds the row re-queues it; others catch up when the old time comes round
+        if self.loaded.pop(rid, None) is not None and (due, rid) <= self.cursor:
+            self._load((rid, due) + row[2:])
+        return due
+
+    def _verify(self, rows):
+        """Drop rows cancelled or snoozed since they were loaded (possibly by another worker)."""
+        current = {}
+        for i in range(0, len(rows), 500):
+            ids = [row[0] for row in rows[i:i + 500]]
+            current.update(self.store.query(
+                f"SELECT id, due FROM reminders WHERE id IN ({', '.join('?' * len(ids))})", ids))
+        ready = []
+        for row in rows:
+            due = current.get(row[0])
+            if due == row[1]:
+                ready.append(row)
+            elif due is not None and (due, row[0]) <= self.cursor:
+                self._load((row[0], due) + row[2:])
+        return ready
+
+    def _claim(self, rows, now):
+        """Delete fired rows (or move recurring ones on) before delivery; returns ``(claimed, repeats)``.
+
+        Each write is conditional on the due time :meth:`_verify` saw, so a
+        snooze or cancel that lands in between wins and that row isn't delivered.
+        """
+        claimed, repeats = [], []
+        with self.store.transaction() as conn:
+            for row in rows:
+                # a recurring reminder keeps its row and moves on to its next occurrence
+                next_due = self._next_due(row, now) if row[6] else None
+                if next_due is None:
+                    cur = conn.execute("DELETE FROM reminders WHERE id = ? AND due = ?", (row[0], row[1]))
+                else:
+                    cur = conn.execute("UPDATE reminders SET due = ? WHERE id = ? AND due = ?",
+                                       (next_due, row[0], row[1]))
+                if cur.rowcount:
+                    claimed.append(row)
+                    if next_due is not None:
+                        repeats.append((row[0], next_due) + row[2:])
+        self.count -= len(claimed) - len(repeats)
+        return claimed, repeats
+
+    def _next_due(self, row, now):
+        """Next occurrence of a recurring row; missed occurrences are skipped, not replayed."""
+        schedule, tz, guild_id = row[6], row[7], row[3]
+        try:
+            schedule = compile_schedule(schedule)
+        except commands.BadArgument:
+            return None
+        zone = reminder_zone(tz, guild_id)
+        due = schedule.next_after(row[1], zone)
+        if due is not None and due <= now:
+            due = schedule.next_after(now, zone)
+        return due
+
+    def _count(self):
+        return self.store.query("SELECT COUNT(*) FROM reminders")[0][0]
+
+    def pending(self):
+        return self.count
+
+    def stats(self):
+        samples = sorted(self.lateness)
+        if not samples:
+            return {"fired": self.fired, "loaded": len(self.loaded), "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        return {
+            "fired": self.fired,
+            "loaded": len(self.loaded),
+            "p50_ms": samples[len(samples) // 2] * 1000,
+            "p99_ms": samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000,
+            "max_ms": samples[-1] * 1000,
+        }
+
+    def _load(self, row):
+        rid, due = row[0], row[1]
+        self.loaded[rid] = row
+        heapq.heappush(self.heap, (due, rid))
+        if self._wakeup is not None and self.heap[0][1] == rid:
+            self._wakeup.set()
+
+    def _refill(self, until):
+        if CLUSTERED:
+            self.count = self._count()  # other workers add and fire reminders too
+        room = self.MAX_LOADED - len(self.loaded)
+        if room <= 0:
+            return
+        due, rid = self.cursor
+        shard_sql, shard_params = shard_filter()
+        rows = self.store.query(
+            "SELECT id, due, user_id, guild_id, channel_id, content, schedule, tz FROM reminders "
+            f"WHERE (due > ? OR (due = ? AND id > ?)) AND due <= ? AND {shard_sql} ORDER BY due, id LIMIT ?",
+            (due, due, rid, until, *shard_params, room),
+        )
+        for row in rows:
+            self._load(row)
+        if len(rows) == room:
+            self.cursor = (rows[-1][1], rows[-1][0])
+        else:
+            self.cursor = (until, sys.maxsize)
+
+    async def _run(self):
+        while True:
+            now = time.time()
+            if len(self.loaded) < self.MAX_LOADED // 2 and self.cursor[0] < now + self.HORIZON / 2:
+                self._refill(now + self.HORIZON)
+            ready = []
+            while self.heap and self.heap[0][0] <= now:
+                due, rid = heapq.heappop(self.heap)
+                row = self.loaded.get(rid)
+                if row is None or row[1] != due:
+                    continue  # cancelled or snoozed while loaded
+                del self.loaded[rid]
+                ready.append(row)
+            claimed, repeats = self._claim(self._verify(ready), now) if ready else ((), ())
+            for row in repeats:
+                if (row[1], row[0]) <= self.cursor:
+                    self._load(row)
+            for row in claimed:
+                self.lateness.append(now - row[1])
+                await SUPERVISOR.spawn(self._deliver(row), owner="reminder-delivery")
+            self.fired += len(claimed)
+            timeout = self.HORIZON / 2
+            if self.heap:
+                timeout = min(timeout, self.heap[0][0] - time.time())
+            self._wakeup.clear()
+            if timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _deliver(self, row):
+        rid, _due, user_id, guild_id, channel_id, content, schedule, _tz = row
+        text = f"⏰ Reminder: {content}" + (f" ({schedule}, #{rid})" if schedule else "")
+        try:
+            user = bot.get_user(user_id) or await bot.fetch_user(user_id)
+            try:
+                await OUTBOX.send(user, text, priority=PRIORITY_REMINDER)
+            except Exception:
+                # DMs closed: post in the guild's reminder channel, else where the reminder was set
+                guild = bot.get_guild(guild_id) if guild_id else None
+                channel = None
+                if guild:
+                    channel = (resolve_channel(guild, get_guild_config(guild_id).get("reminder_channel"))
+                               or guild.get_channel(channel_id))
+                if channel:
+                    await OUTBOX.send(channel, f"{user.mention} {text}", priority=PRIORITY_REMINDER, merge=True)
+        except Exception as e:
+            log(f"Failed to deliver reminder to {user_id}: {e}")
+
+
+REMINDERS = ReminderScheduler(STORE)
+
+
+@bot.event
+async def setup_hook():
+    OUTBOX.start()
+    REMINDERS.start()
+    LEDGER.start()
+    RANDOM_MESSAGES.start()
+    SUPERVISOR.start("config-flusher", config_flusher)
+    SUPERVISOR.start("log-shipper", log_shipper)
+    if CLUSTERED:
+        SUPERVISOR.start("config-invalidations", config_invalidation_watcher)
+        log(f"Cluster worker {CLUSTER_ID}: shards {SHARD_IDS} of {SHARD_COUNT}")
+    await start_metrics()
+    if CLUSTER_ID == 0:
+        try:
+            await sync_commands()
+        except Exception as e:
+            log(f"Failed to sync application commands: {e}")
+    log(f"Reminder scheduler started with {REMINDERS.pending()} pending reminder(s)")
+
+
+def schedule_reminder(user_id, text, guild_id, channel_id, tz=None):
+    """Parse and store a reminder; returns the confirmation text (raises commands.BadArgument)."""
+    delay, schedule, own_tz, message = parse_reminder(text)
+    if schedule is None:
+        REMINDERS.add(user_id, message, delay, guild_id=guild_id, channel_id=channel_id)
+        return f"I'll remind you <t:{int(time.time() + delay)}:R>."
+    tz = tz or own_tz
+    if tz:
+        get_zone(tz)
+    _rid, due = REMINDERS.add_recurring(user_id, message, schedule, tz=tz, guild_id=guild_id, channel_id=channel_id)
+    zone = "" if schedule.interval else f" ({getattr(reminder_zone(tz, guild_id), 'key', 'UTC')})"
+    return f"I'll remind you {schedule.text}{zone}, starting <t:{int(due)}:F>."
+
+
+@bot.command()
+async def remind(ctx, *, text: str):
+    """Set a reminder: a delay (10m, 2h) or a schedule (every weekday 09:00, cron "0 9 * * 1-5")."""
+    try:
+        reply = schedule_reminder(ctx.author.id, text, ctx.guild.id if ctx.guild else None, ctx.channel.id)
+    except commands.BadArgument as e:
+        await ctx.send(f"{e} " + REMIND_USAGE.format(p=ctx.clean_prefix))
+        return
+    await ctx.send(f"Okay {ctx.author.mention}, {reply}")
+
+
+@bot.tree.command(name="remind")
+@app_commands.describe(when="A delay (10m, 2h, 1d), `every weekday 09:00`, `every 2h` or `cron 0 9 * * 1-5`",
+                       message="Reminder message",
+                       timezone="Time zone for schedules, e.g. Europe/Berlin (default: the server's)")
+async def slash_remind(interaction: discord.Interaction, when: str, message: str, timezone: str = None):
+    try:
+        reply = schedule_reminder(interaction.user.id, f"{when} {message}", interaction.guild_id,
+                                  interaction.channel_id, tz=timezone)
+    except commands.BadArgument as e:
+        await interaction.response.send_message(f"{e} " + REMIND_USAGE.format(p="/"), ephemeral=True)
+        return
+    await interaction.response.send_message(f"Okay {interaction.user.mention}, {reply}", ephemeral=True)
+
+
+REMINDER_PAGE = 10
+
+
+def format_reminder(row):
+    rid, due, _guild_id, content, schedule, _tz = row
+    repeat = f" · {schedule}" if schedule else ""
+    text = content if len(content) <= 80 else content[:79] + "…"
+    return f"`#{rid}` <t:{int(due)}:f> (<t:{int(due)}:R>){repeat}\n{text}"
+
+
+class ReminderPages(discord.ui.View):
+    """Previous/Next buttons over a user's reminders. Pages are fetched by (due, id)
+    cursor, so each one costs an index seek plus the page, however many reminders there are."""
+
+    def __init__(self, user_id):
+        super().__init__(timeout=180)
+        self.user_id = user_id
+        self.cursors = [None]   # where each page seen so far starts
+        self.rows = []
+        self.load()
+
+    def load(self):
+        rows = REMINDERS.list_for(self.user_id, self.cursors[-1], REMINDER_PAGE + 1)
+        self.rows = rows[:REMINDER_PAGE]
+        self.previous.disabled = len(self.cursors) == 1
+        self.next.disabled = len(rows) <= REMINDER_PAGE
+
+    def embed(self):
+        embed = discord.Embed(title="Your reminders", color=0x3498db,
+                              description="\n".join(map(format_reminder, self.rows)) or "Nothing on this page.")
+        embed.set_footer(text=f"Page {len(self.cursors)} · cancelreminder <id> / snooze <id> <time>")
+        return embed
+
+    async def interaction_check(self, interaction):
+        return interaction.user.id == self.user_id
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction, button):
+        self.cursors.pop()
+        self.load()
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction, button):
+        last = self.rows[-1]
+        self.cursors.append((last[1], last[0]))
+        self.load()
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+
+def cancel_reminders(user_id, targets, guild_id):
+    """Cancel reminders by id, or ``all`` of them, or ``here`` (this server); returns a reply."""
+    words = [t.lower().lstrip("#") for t in " ".join(targets).replace(",", " ").split()]
+    if words == ["all"]:
+        removed = REMINDERS.cancel_all(user_id)
+    elif words == ["here"] and guild_id:
+        removed = REMINDERS.cancel_all(user_id, guild_id)
+    elif words and all(w.isdigit() for w in words):
+        removed = REMINDERS.cancel(user_id, [int(w) for w in words])
+    else:
+        return "Usage: cancelreminder <id> [id...] | here | all"
+    if not removed:
+        return "No matching reminders of yours."
+    return f"Cancelled {len(removed)} reminder(s): " + ", ".join(f"#{rid}" for rid in removed[:20])
+
+
+def snooze_reminder(user_id, reminder_id, duration):
+    try:
+        delay = check_delay(parse_duration(duration))
+    except commands.BadArgument as e:
+        return str(e)
+    due = REMINDERS.snooze(user_id, reminder_id, delay)
+    if due is None:
+        return f"You have no reminder #{reminder_id}."
+    return f"Reminder #{reminder_id} moved to <t:{int(due)}:f> (<t:{int(due)}:R>)."
+
+
+@bot.command()
+async def myreminders(ctx):
+    view = ReminderPages(ctx.author.id)
+    if not view.rows:
+        await ctx.send("You have no pending reminders.")
+        return
+    await ctx.send(embed=view.embed(), view=view)
+
+
+@bot.command(aliases=["cancelreminders"])
+async def cancelreminder(ctx, *targets: str):
+    """Cancel reminders: ``cancelreminder 12 15``, ``cancelreminder here`` or ``cancelreminder all``."""
+    await ctx.send(cancel_reminders(ctx.author.id, targets, ctx.guild.id if ctx.guild else None))
+
+
+@bot.command()
+async def snooze(ctx, reminder_id: int, duration: str = "10m"):
+    await ctx.send(snooze_reminder(ctx.author.id, reminder_id, duration))
+
+
+@bot.tree.command(name="myreminders")
+async def slash_myreminders(interaction: discord.Interaction):
+    view = ReminderPages(interaction.user.id)
+    if not view.rows:
+        await interaction.response.send_message("You have no pending reminders.", ephemeral=True)
+        return
+    await interaction.response.send_message(embed=view.embed(), view=view, ephemeral=True)
+
+
+@bot.tree.command(name="cancelreminder")
+@app_commands.describe(reminders="Reminder ids (e.g. 12 15), 'here' for this server or 'all'")
+async def slash_cancelreminder(interaction: discord.Interaction, reminders: str):
+    await interaction.response.send_message(
+        cancel_reminders(interaction.user.id, [reminders], interaction.guild_id), ephemeral=True)
+
+
+@bot.tree.command(name="snooze")
+@app_commands.describe(reminder_id="Reminder id from /myreminders", duration="How long to push it back (default 10m)")
+async def slash_snooze(interaction: discord.Interaction, reminder_id: int, duration: str = "10m"):
+    await interaction.response.send_message(snooze_reminder(interaction.user.id, reminder_id, duration),
+                                            ephemeral=True)
+
+
+# DM commands have been removed per project decision.
+# Direct messaging other users via the bot is no longer supported.
+
+
+# Bulk permission overwrites. Edits run with bounded concurrency and are paced
+# to OVERWRITE_RATE per second so a large guild stays well under Discord's
+# global limit; discord.py already waits out per-route buckets and 429s.
+OVERWRITE_CONCURRENCY = 5
+OVERWRITE_RATE = 10
+MUTE_ROLE_NAME = "Ron Muted"
+
+
+async def bulk_set_permissions(guild, target, overwrite_for, channels=None, progress=None, reason=None):
+    """Apply ``overwrite_for(channel)`` for ``target`` on every channel (categories first).
+
+    ``overwrite_for`` returns a PermissionOverwrite, or None to skip a channel.
+    ``progress(done, total)`` is awaited every 25 channels and at the end.
+    Returns ``(updated, failed)``.
+    """
+    channels = sorted(guild.channels if channels is None else channels,
+                      key=lambda ch: not isinstance(ch, discord.CategoryChannel))
+    total = len(channels)
+    sem = asyncio.Semaphore(OVERWRITE_CONCURRENCY)
+    loop = asyncio.get_running_loop()
+    next_slot = loop.time()
+    done = updated = failed = 0
+
+    async def _apply(ch):
+        nonlocal next_slot, done, updated, failed
+        overwrite = overwrite_for(ch)
+        if overwrite is not None:
+            async with sem:
+                now = loop.time()
+                slot = max(now, next_slot)
+                next_slot = slot + 1 / OVERWRITE_RATE
+                await asyncio.sleep(slot - now)
+                try:
+                    await ch.set_permissions(target, overwrite=overwrite, reason=reason)
+                    updated += 1
+                except Exception as e:
+                    failed += 1
+                    log(f"Failed to update permissions in #{ch.name} ({guild.id}): {e}")
+        done += 1
+        if progress and (done % 25 == 0 or done == total):
+            await progress(done, total)
+
+    await asyncio.gather(*(_apply(ch) for ch in channels))
+    return updated, failed
+
+
+def mute_overwrite(channel):
+    if isinstance(channel, (discord.VoiceChannel, discord.StageChannel)):
+        return discord.PermissionOverwrite(speak=False, send_messages=False, add_reactions=False)
+    if isinstance(channel, discord.CategoryChannel):
+        return discord.PermissionOverwrite(send_messages=False, add_reactions=False,
+                                           send_messages_in_threads=False, speak=False)
+    return discord.PermissionOverwrite(send_messages=False, add_reactions=False, send_messages_in_threads=False)
+
+
+async def provision_mute_role(guild, role):
+    async def _progress(done, total):
+        log(f"Mute role setup in {guild.name}: {done}/{total} channels")
+
+    updated, failed = await bulk_set_permissions(guild, role, mute_overwrite, progress=_progress,
+                                                 reason="Mute role setup by Ron")
+    await log_action(guild, f"Mute role set up in {updated} channel(s) ({failed} failed).")
+
+
+async def get_mute_role(guild):
+    """Return the mute role, creating it and provisioning channels in the background if missing."""
+    role = resolve_role(guild, MUTE_ROLE_NAME)
+    if not role:
+        role = await guild.create_role(name=MUTE_ROLE_NAME, reason="Created for muting by Ron")
+        _index_add(guild.id, 1, role.name, role.id)
+        SUPERVISOR.start(f"mute-role:{guild.id}", lambda: provision_mute_role(guild, role), owner="moderation")
+    return role
+
+
+async def mute_member(guild, member, minutes=0, reason=None):
+    """Give ``member`` the mute role, with an auto-unmute after ``minutes`` if positive."""
+    role = await get_mute_role(guild)
+    await member.add_roles(role, reason=reason)
+    if minutes > 0:
+        LEDGER.add(guild.id, member.id, "unmute", minutes * 60, role_id=role.id)
+    return role
+
+
+# Timed moderation ledger. Every action with an expiry (currently auto-unmute)
+# is a row indexed by expiry time; one task applies whatever is due, in batches
+# of at most MAX_PARALLEL, and sleeps until the next expiry. Rows survive
+# restarts and are reconciled against live role membership in on_ready.
+async def _expire_unmute(guild, user_id, role_id, created, expires):
+    role = guild.get_role(role_id) if role_id else resolve_role(guild, MUTE_ROLE_NAME)
+    if not role:
         return
-    await ctx.send(f"Okay {ctx.author.mention}, I'll remind you in {minutes} minute(s).")
+    member = await fetch_member(guild, user_id)
+    if member is None:
+        return
+    await member.remove_roles(role, reason="Timed mute expired")
+    minutes = round((expires - created) / 60)
+    await log_action(guild, f"Auto-unmuted {member} after {minutes} minute(s).")
 
-    async def _reminder(delay, user, content):
-        await asyncio.sleep(delay)
-        try:
-            await user.send(f"⏰ Reminder: {content}")
-        except Exception:
-            # fallback to a general channel named 'general' in user's first guild if possible
-            channel = None
+
+EXPIRY_ACTIONS = {"unmute": _expire_unmute}
+
+
+class ModerationLedger:
+    MAX_PARALLEL = 10
+
+    def __init__(self, store):
+        self.store = store
+        self.store.script("""
+            CREATE TABLE IF NOT EXISTS mod_ledger (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                action TEXT NOT NULL,
+                role_id INTEGER,
+                created REAL NOT NULL,
+                expires REAL NOT NULL,
+                PRIMARY KEY (guild_id, user_id, action)
+            );
+            CREATE INDEX IF NOT EXISTS mod_ledger_expires ON mod_ledger (expires);
+        """)
+        self._wakeup = None
+
+    def start(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        return SUPERVISOR.start("moderation-ledger", self._run, owner="moderation")
+
+    def add(self, guild_id, user_id, action, delay, role_id=None):
+        now = time.time()
+        self.store.execute(
+            "INSERT OR REPLACE INTO mod_ledger (guild_id, user_id, action, role_id, created, expires) VALUES (?, ?, ?, ?, ?, ?)",
+            (guild_id, user_id, action, role_id, now, now + delay),
+        )
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def cancel(self, guild_id, user_id, action):
+        self.store.execute("DELETE FROM mod_ledger WHERE guild_id = ? AND user_id = ? AND action = ?",
+                           (guild_id, user_id, action))
+
+    def pending(self):
+        return self.store.query("SELECT COUNT(*) FROM mod_ledger")[0][0]
+
+    def reconcile(self):
+        """Drop unmute rows whose member no longer has the role, then let the loop apply overdue ones."""
+        stale = []
+        shard_sql, shard_params = shard_filter()
+        for guild_id, user_id, role_id in self.store.query(
+                f"SELECT guild_id, user_id, role_id FROM mod_ledger WHERE action = 'unmute' AND {shard_sql}", shard_params):
+            guild = bot.get_guild(guild_id)
+            if guild is None or not guild.chunked:
+                continue
+            member = guild.get_member(user_id)
+            if member is None or member.get_role(role_id) is None:
+                stale.append((guild_id, user_id))
+        if stale:
+            self.store.executemany("DELETE FROM mod_ledger WHERE guild_id = ? AND user_id = ? AND action = 'unmute'", stale)
+        log(f"Moderation ledger reconciled: {len(stale)} stale, {self.pending()} pending")
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _apply(self, row, sem):
+        guild_id, user_id, action, role_id, created, expires = row
+        guild = bot.get_guild(guild_id)
+        if guild is None:
+            # before READY guilds aren't cached yet, so keep the row until reconcile()
+            return bot.is_ready()
+        async with sem:
             try:
-                if user.guilds:
-                    channel = discord.utils.get(user.guilds[0].text_channels, name="general")
-            except Exception:
+                await EXPIRY_ACTIONS[action](guild, user_id, role_id, created, expires)
+            except Exception as e:
+                log(f"Failed to expire {action} for {user_id} in {guild_id}: {e}")
+        return True
+
+    async def _run(self):
+        sem = asyncio.Semaphore(self.MAX_PARALLEL)
+        shard_sql, shard_params = shard_filter()
+        while True:
+            now = time.time()
+            rows = self.store.query(
+                "SELECT guild_id, user_id, action, role_id, created, expires FROM mod_ledger "
+                f"WHERE expires <= ? AND {shard_sql} ORDER BY expires LIMIT 500", (now, *shard_params))
+            if rows:
+                done = await asyncio.gather(*(self._apply(row, sem) for row in rows))
+                self.store.executemany(
+                    "DELETE FROM mod_ledger WHERE guild_id = ? AND user_id = ? AND action = ? AND expires = ?",
+                    [(r[0], r[1], r[2], r[5]) for r, ok in zip(rows, done) if ok])
+                if all(done):
+                    continue
+            nxt = self.store.query(f"SELECT MIN(expires) FROM mod_ledger WHERE expires > ? AND {shard_sql}",
+                                   (now, *shard_params))[0][0]
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), None if nxt is None else nxt - now)
+            except asyncio.TimeoutError:
                 pass
-            if channel:
-                await channel.send(f"{user.mention} ⏰ Reminder: {content}")
 
-    asyncio.create_task(_reminder(minutes * 60, ctx.author, message))
 
+LEDGER = ModerationLedger(STORE)
 
-@bot.tree.command(name="remind")
-@app_commands.describe(minutes="Minutes until reminder", message="Reminder message")
-async def slash_remind(interaction: discord.Interaction, minutes: float, message: str):
-    if minutes <= 0:
-        await interaction.response.send_message("Please provide a positive number of minutes.", ephemeral=True)
-        return
-    await interaction.response.send_message(f"Okay {interaction.user.mention}, I'll remind you in {minutes} minute(s).", ephemeral=True)
 
-    async def _reminder(delay, user, content):
-        await asyncio.sleep(delay)
+# Purge engine. History is streamed newest-first in pages; matching messages are
+# bulk-deleted 100 at a time while they are younger than Discord's 14-day bulk
+# delete limit and one by one after that. Each channel runs at most one purge,
+# as a supervised task that can be cancelled.
+PURGE_MAX = 10000              # matching messages deleted per purge
+PURGE_SCAN_MAX = 50000         # messages inspected per purge
+PURGE_BATCH = 100              # Discord's bulk delete maximum
+PURGE_PROGRESS_INTERVAL = 3.0  # seconds between progress updates
+BULK_DELETE_MAX_AGE = 14 * 86400 - 60
+PURGE_MAX_AGE = 20 * 365 * 86400  # longer than Discord has existed; omit age: to purge regardless
+METRICS.describe("kevin_purged_messages_total", "Messages deleted by purges, by bulk or single delete")
+
+DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)\s*([smhdw])")
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_duration(text):
+    """Parse ``90s``, ``30m``, ``1d12h`` or a bare number of minutes into seconds."""
+    text = text.strip().lower()
+    try:
+        seconds = float(text) * 60
+    except ValueError:
+        parts = DURATION_RE.findall(text)
+        if not parts or DURATION_RE.sub("", text).strip():
+            raise commands.BadArgument(f"Couldn't read '{text}' as a duration (try 30m, 2h or 3d).") from None
+        seconds = sum(float(n) * DURATION_UNITS[unit] for n, unit in parts)
+    if not math.isfinite(seconds):
+        raise commands.BadArgument(f"Couldn't read '{text}' as a duration (try 30m, 2h or 3d).")
+    return seconds
+
+
+def purge_check(user=None, pattern=None, attachments=False):
+    def check(message):
+        if user is not None and message.author.id != user.id:
+            return False
+        if attachments and not message.attachments:
+            return False
+        return pattern is None or pattern.search(message.content) is not None
+    return check
+
+
+class PurgeJob:
+    def __init__(self, channel, limit, check, max_age=None, before=None, reason=None):
+        self.channel = channel
+        self.limit = max(1, min(limit, PURGE_MAX))
+        self.check = check
+        self.max_age = max_age
+        self.before = before
+        self.reason = reason
+        self.deleted = 0
+        self.scanned = 0
+
+    async def _bulk(self, batch):
+        if len(batch) == 1:
+            await self._single(batch[0])
+        elif batch:
+            await self.channel.delete_messages(batch, reason=self.reason)
+            self.deleted += len(batch)
+            METRICS.inc("kevin_purged_messages_total", len(batch), mode="bulk")
+        batch.clear()
+
+    async def _single(self, message):
         try:
-            await user.send(f"⏰ Reminder: {content}")
-        except Exception:
-            try:
-                if user.guilds:
-                    channel = discord.utils.get(user.guilds[0].text_channels, name="general")
+            await message.delete()
+        except discord.NotFound:
+            return
+        self.deleted += 1
+        METRICS.inc("kevin_purged_messages_total", mode="single")
+
+    async def run(self, progress=None):
+        """Delete up to ``limit`` matching messages; ``progress()`` is awaited every few seconds."""
+        now = discord.utils.utcnow()
+        after = now - timedelta(seconds=self.max_age) if self.max_age else None
+        bulk_cutoff = now - timedelta(seconds=BULK_DELETE_MAX_AGE)
+        loop = asyncio.get_running_loop()
+        last_report = loop.time()
+        batch, matched = [], 0
+        async for message in self.channel.history(limit=PURGE_SCAN_MAX, before=self.before, after=after,
+                                                  oldest_first=False):
+            self.scanned += 1
+            if self.check(message):
+                matched += 1
+                if message.created_at > bulk_cutoff:
+                    batch.append(message)
+                    if len(batch) == PURGE_BATCH:
+                        await self._bulk(batch)
                 else:
-                    channel = None
-            except Exception:
-                channel = None
-            if channel:
-                await channel.send(f"{user.mention} ⏰ Reminder: {content}")
+                    # newest-first, so everything from here on is too old to bulk delete
+                    await self._bulk(batch)
+                    await self._single(message)
+                if matched >= self.limit:
+                    break
+            if progress and loop.time() - last_report >= PURGE_PROGRESS_INTERVAL:
+                last_report = loop.time()
+                await progress()
+        await self._bulk(batch)
 
-    asyncio.create_task(_reminder(minutes * 60, interaction.user, message))
 
+async def run_purge(job, report, actor):
+    """Run ``job`` and keep ``report(text, done=False)`` updated; the outcome goes to the mod log."""
+    status = "Purge finished"
+    reporting = True
 
-# DM commands have been removed per project decision.
-# Direct messaging other users via the bot is no longer supported.
+    async def _progress():
+        # a failed edit (e.g. an interaction token past its 15 minutes) must not stop the purge
+        nonlocal reporting
+        if not reporting:
+            return
+        try:
+            await report(f"Purging... {job.deleted} deleted, {job.scanned} scanned (`purge cancel` to stop)")
+        except discord.HTTPException as e:
+            reporting = False
+            log(f"Purge progress in #{job.channel.name} ({job.channel.guild.id}) can no longer be shown: {e}")
+
+    try:
+        await job.run(progress=_progress)
+    except asyncio.CancelledError:
+        status = "Purge cancelled"
+        raise
+    except Exception as e:
+        status = f"Purge stopped ({e})"
+        log(f"Purge in #{job.channel.name} ({job.channel.guild.id}) failed: {e}")
+    finally:
+        summary = f"{status}: deleted {job.deleted} message(s) of {job.scanned} scanned."
+        try:
+            await report(summary, done=True)
+        except Exception as e:
+            log(f"Failed to report purge result in #{job.channel.name}: {e}")
+        await log_action(job.channel.guild, f"{actor} purged {job.deleted} messages in #{job.channel.name}.")
+
+
+def start_purge(job, report, actor):
+    """Start ``job`` in the background; returns False if the channel already has a purge running."""
+    name = f"purge:{job.channel.id}"
+    if SUPERVISOR.running(name):
+        return False
+    SUPERVISOR.start(name, lambda: run_purge(job, report, actor), owner="moderation")
+    return True
+
+
+def build_purge_job(channel, limit, user, match, attachments, age, before=None, reason=None):
+    try:
+        pattern = re.compile(match, re.IGNORECASE) if match else None
+    except re.error as e:
+        raise commands.BadArgument(f"Invalid pattern: {e}")
+    max_age = parse_duration(age) if age else None
+    # also rejects inf/nan, which timedelta can't hold
+    if max_age is not None and not 0 < max_age <= PURGE_MAX_AGE:
+        raise commands.BadArgument(f"age: must be between 1s and {PURGE_MAX_AGE // 86400}d.")
+    return PurgeJob(channel, limit, purge_check(user, pattern, attachments), max_age=max_age,
+                    before=before, reason=reason)
+
+
+class PurgeFlags(commands.FlagConverter):
+    user: discord.User = None
+    match: str = None
+    attachments: bool = False
+    age: str = None
 
 
 # Moderation commands (Ron)
-@bot.command()
-async def purge(ctx, limit: int = 10):
-    cfg = get_guild_config(ctx.guild.id)
-    mod_role = cfg.get("mod_role")
-    if not (ctx.author.guild.permissions.administrator or ctx.author.guild.permissions.manage_guild):
-        if mod_role:
-            role = discord.utils.get(ctx.guild.roles, name=mod_role)
-            if not (role and role in ctx.author.roles):
-                await ctx.send("You don't have permission to do that.")
-                return
-        else:
-            await ctx.send("You don't have permission to do that.")
-            return
-    deleted = await ctx.channel.purge(limit=limit)
-    await ctx.send(f"Deleted {len(deleted)} messages.", delete_after=5)
-    await log_action(ctx.guild, f"{ctx.author} purged {len(deleted)} messages in #{ctx.channel.name}.")
+@bot.group(invoke_without_command=True)
+@mod_only()
+async def purge(ctx, limit: typing.Optional[int] = 10, *, flags: PurgeFlags):
+    """Delete up to ``limit`` messages, optionally filtered with user:, match:, attachments: and age:.
+
+    The limit may be left out (``purge user:@x``); it defaults to 10.
+    """
+    try:
+        job = build_purge_job(ctx.channel, limit, flags.user, flags.match, flags.attachments, flags.age,
+                              before=ctx.message, reason=f"Purge by {ctx.author}")
+    except commands.BadArgument as e:
+        await OUTBOX.send(ctx, str(e))
+        return
+    status = await OUTBOX.send(ctx, f"Purging up to {job.limit} messages...")
+
+    async def report(text, done=False):
+        await status.edit(content=text, delete_after=10 if done else None)
+
+    if not start_purge(job, report, ctx.author):
+        await status.edit(content="A purge is already running here; use `purge cancel` to stop it.")
+        return
+    try:
+        await ctx.message.delete()
+    except discord.HTTPException:
+        pass
+
+
+@purge.command(name="cancel")
+@mod_only()
+async def purge_cancel(ctx):
+    """Stop the purge running in this channel."""
+    if not SUPERVISOR.cancel(f"purge:{ctx.channel.id}"):
+        await OUTBOX.send(ctx, "No purge is running in this channel.", delete_after=5)
 
 
 @bot.tree.command(name="purge")
-@app_commands.describe(limit="Number of recent messages to delete")
-async def slash_purge(interaction: discord.Interaction, limit: int = 10):
-    if not interaction.guild:
-        await interaction.response.send_message("This command must be used in a server.", ephemeral=True)
+@app_commands.describe(limit="Number of matching messages to delete",
+                       user="Only delete messages from this user",
+                       match="Only delete messages matching this regular expression",
+                       attachments="Only delete messages with attachments",
+                       age="Only delete messages newer than this (e.g. 30m, 2h, 3d)")
+@mod_only()
+async def slash_purge(interaction: discord.Interaction, limit: int = 10, user: discord.User = None,
+                      match: str = None, attachments: bool = False, age: str = None):
+    try:
+        job = build_purge_job(interaction.channel, limit, user, match, attachments, age,
+                              before=discord.utils.utcnow(), reason=f"Purge by {interaction.user}")
+    except commands.BadArgument as e:
+        await interaction.response.send_message(str(e), ephemeral=True)
         return
-    cfg = get_guild_config(interaction.guild.id)
-    mod_role = cfg.get("mod_role")
-    user = interaction.user
-    if not (user.guild.permissions.administrator or user.guild.permissions.manage_guild):
-        if mod_role:
-            role = discord.utils.get(interaction.guild.roles, name=mod_role)
-            if not (role and role in user.roles):
-                await interaction.response.send_message("You don't have permission.", ephemeral=True)
-                return
-        else:
-            await interaction.response.send_message("You don't have permission.", ephemeral=True)
-            return
-    deleted = await interaction.channel.purge(limit=limit)
-    await interaction.response.send_message(f"Deleted {len(deleted)} messages.", ephemeral=True)
-    await log_action(interaction.guild, f"{interaction.user} purged {len(deleted)} messages in #{interaction.channel.name}.")
+    # respond straight away; progress is shown by editing this response
+    await interaction.response.send_message(f"Purging up to {job.limit} messages...", ephemeral=True)
+
+    async def report(text, done=False):
+        await interaction.edit_original_response(content=text)
+
+    if not start_purge(job, report, interaction.user):
+        await report("A purge is already running here; use `/purgecancel` to stop it.")
+
+
+@bot.tree.command(name="purgecancel")
+@mod_only()
+async def slash_purgecancel(interaction: discord.Interaction):
+    if SUPERVISOR.cancel(f"purge:{interaction.channel.id}"):
+        await interaction.response.send_message("Cancelling the purge.", ephemeral=True)
+    else:
+        await interaction.response.send_message("No purge is running in this channel.", ephemeral=True)
 
 
 @bot.command()
-async def kick(ctx, member: discord.Member, *, reason: str = None):
-    cfg = get_guild_config(ctx.guild.id)
-    mod_role = cfg.get("mod_role")
-    if not (ctx.author.guild.permissions.administrator or ctx.author.guild.permissions.manage_guild):
-        if mod_role:
-            role = discord.utils.get(ctx.guild.roles, name=mod_role)
-            if not (role and role in ctx.author.roles):
-                await ctx.send("You don't have permission to do that.")
-                return
-        else:
-            await ctx.send("You don't have permission to do that.")
-            return
+@mod_only()
+async def kick(ctx, member: FetchMember, *, reason: str = None):
     try:
         await member.kick(reason=reason)
-        await ctx.send(f"Kicked {member}.")
+        await OUTBOX.send(ctx, f"Kicked {member}.")
         await log_action(ctx.guild, f"{ctx.author} kicked {member}. Reason: {reason}")
     except Exception as e:
-        await ctx.send(f"Failed to kick: {e}")
+        await OUTBOX.send(ctx, f"Failed to kick: {e}")
 
 
 @bot.tree.command(name="kick")
 @app_commands.describe(member="Member to kick", reason="Reason for the kick")
+@mod_only()
 async def slash_kick(interaction: discord.Interaction, member: discord.Member, reason: str = None):
-    # reuse permission check logic from earlier
-    cfg = get_guild_config(interaction.guild.id)
-    mod_role = cfg.get("mod_role")
-    user = interaction.user
-    if not (user.guild.permissions.administrator or user.guild.permissions.manage_guild):
-        if mod_role:
-            role = discord.utils.get(interaction.guild.roles, name=mod_role)
-            if not (role and role in user.roles):
-                await interaction.response.send_message("You don't have permission.", ephemeral=True)
-                return
-        else:
-            await interaction.response.send_message("You don't have permission.", ephemeral=True)
-            return
     try:
         await member.kick(reason=reason)
         await interaction.response.send_message(f"Kicked {member}.")
@@ -441,41 +3322,20 @@ async def slash_kick(interaction: discord.Interaction, member: discord.Member, r
 
 
 @bot.command()
-async def ban(ctx, member: discord.Member, days: int = 0, *, reason: str = None):
-    cfg = get_guild_config(ctx.guild.id)
-    mod_role = cfg.get("mod_role")
-    if not (ctx.author.guild.permissions.administrator or ctx.author.guild.permissions.manage_guild):
-        if mod_role:
-            role = discord.utils.get(ctx.guild.roles, name=mod_role)
-            if not (role and role in ctx.author.roles):
-                await ctx.send("You don't have permission to do that.")
-                return
-        else:
-            await ctx.send("You don't have permission to do that.")
-            return
+@mod_only()
+async def ban(ctx, member: FetchMember, days: int = 0, *, reason: str = None):
     try:
         await member.ban(reason=reason, delete_message_days=days)
-        await ctx.send(f"Banned {member}.")
+        await OUTBOX.send(ctx, f"Banned {member}.")
         await log_action(ctx.guild, f"{ctx.author} banned {member}. Reason: {reason}")
     except Exception as e:
-        await ctx.send(f"Failed to ban: {e}")
+        await OUTBOX.send(ctx, f"Failed to ban: {e}")
 
 
 @bot.tree.command(name="ban")
 @app_commands.describe(member="Member to ban", days="Delete message history days (0-7)", reason="Reason for ban")
+@mod_only()
 async def slash_ban(interaction: discord.Interaction, member: discord.Member, days: int = 0, reason: str = None):
-    cfg = get_guild_config(interaction.guild.id)
-    mod_role = cfg.get("mod_role")
-    user = interaction.user
-    if not (user.guild.permissions.administrator or user.guild.permissions.manage_guild):
-        if mod_role:
-            role = discord.utils.get(interaction.guild.roles, name=mod_role)
-            if not (role and role in user.roles):
-                await interaction.response.send_message("You don't have permission.", ephemeral=True)
-                return
-        else:
-            await interaction.response.send_message("You don't have permission.", ephemeral=True)
-            return
     try:
         await member.ban(reason=reason, delete_message_days=days)
         await interaction.response.send_message(f"Banned {member}.")
@@ -485,139 +3345,194 @@ async def slash_ban(interaction: discord.Interaction, member: discord.Member, da
 
 
 @bot.command()
-async def mute(ctx, member: discord.Member, minutes: int = 0):
-    cfg = get_guild_config(ctx.guild.id)
-    mod_role = cfg.get("mod_role")
-    if not (ctx.author.guild.permissions.administrator or ctx.author.guild.permissions.manage_guild):
-        if mod_role:
-            role = discord.utils.get(ctx.guild.roles, name=mod_role)
-            if not (role and role in ctx.author.roles):
-                await ctx.send("You don't have permission to do that.")
-                return
-        else:
-            await ctx.send("You don't have permission to do that.")
-            return
+@mod_only()
+async def mute(ctx, member: FetchMember, minutes: int = 0):
     guild = ctx.guild
-    role = discord.utils.get(guild.roles, name="Ron Muted")
-    if not role:
-        role = await guild.create_role(name="Ron Muted", reason="Created for muting by Ron")
-        for ch in guild.text_channels:
-            try:
-                await ch.set_permissions(role, send_messages=False, add_reactions=False)
-            except Exception:
-                pass
     try:
-        await member.add_roles(role)
-        await ctx.send(f"Muted {member}.")
+        await mute_member(guild, member, minutes)
+        note = " (mute role is still being applied to channels)" if SUPERVISOR.running(f"mute-role:{guild.id}") else ""
+        await OUTBOX.send(ctx, f"Muted {member}.{note}")
         await log_action(guild, f"{ctx.author} muted {member}.")
-        if minutes > 0:
-            async def _unmute_after(delay, gm, m, r):
-                await asyncio.sleep(delay)
-                try:
-                    await m.remove_roles(r)
-                    await log_action(gm, f"Auto-unmuted {m} after {minutes} minute(s).")
-                except Exception:
-                    pass
-            asyncio.create_task(_unmute_after(minutes * 60, guild, member, role))
     except Exception as e:
-        await ctx.send(f"Failed to mute: {e}")
+        await OUTBOX.send(ctx, f"Failed to mute: {e}")
 
 
 @bot.tree.command(name="mute")
 @app_commands.describe(member="Member to mute", minutes="Minutes to auto-unmute (optional)")
+@mod_only()
 async def slash_mute(interaction: discord.Interaction, member: discord.Member, minutes: int = 0):
-    cfg = get_guild_config(interaction.guild.id)
-    mod_role = cfg.get("mod_role")
-    user = interaction.user
-    if not (user.guild.permissions.administrator or user.guild.permissions.manage_guild):
-        if mod_role:
-            role = discord.utils.get(interaction.guild.roles, name=mod_role)
-            if not (role and role in user.roles):
-                await interaction.response.send_message("You don't have permission.", ephemeral=True)
-                return
-        else:
-            await interaction.response.send_message("You don't have permission.", ephemeral=True)
-            return
     guild = interaction.guild
-    role = discord.utils.get(guild.roles, name="Ron Muted")
-    if not role:
-        role = await guild.create_role(name="Ron Muted", reason="Created for muting by Ron")
-        for ch in guild.text_channels:
-            try:
-                await ch.set_permissions(role, send_messages=False, add_reactions=False)
-            except Exception:
-                pass
     try:
-        await member.add_roles(role)
-        await interaction.response.send_message(f"Muted {member}.")
+        await mute_member(guild, member, minutes)
+        note = " (mute role is still being applied to channels)" if SUPERVISOR.running(f"mute-role:{guild.id}") else ""
+        await interaction.response.send_message(f"Muted {member}.{note}")
         await log_action(guild, f"{interaction.user} muted {member}.")
-        if minutes > 0:
-            async def _unmute_after(delay, gm, m, r):
-                await asyncio.sleep(delay)
-                try:
-                    await m.remove_roles(r)
-                    await log_action(gm, f"Auto-unmuted {m} after {minutes} minute(s).")
-                except Exception:
-                    pass
-            asyncio.create_task(_unmute_after(minutes * 60, guild, member, role))
     except Exception as e:
         await interaction.response.send_message(f"Failed to mute: {e}", ephemeral=True)
 
 
 @bot.command()
-async def unmute(ctx, member: discord.Member):
-    cfg = get_guild_config(ctx.guild.id)
-    mod_role = cfg.get("mod_role")
-    if not (ctx.author.guild.permissions.administrator or ctx.author.guild.permissions.manage_guild):
-        if mod_role:
-            role = discord.utils.get(ctx.guild.roles, name=mod_role)
-            if not (role and role in ctx.author.roles):
-                await ctx.send("You don't have permission to do that.")
-                return
-        else:
-            await ctx.send("You don't have permission to do that.")
-            return
+@mod_only()
+async def unmute(ctx, member: FetchMember):
     guild = ctx.guild
-    role = discord.utils.get(guild.roles, name="Ron Muted")
+    role = resolve_role(guild, MUTE_ROLE_NAME)
     if not role:
-        await ctx.send("No mute role exists.")
+        await OUTBOX.send(ctx, "No mute role exists.")
         return
     try:
         await member.remove_roles(role)
-        await ctx.send(f"Unmuted {member}.")
+        LEDGER.cancel(guild.id, member.id, "unmute")
+        await OUTBOX.send(ctx, f"Unmuted {member}.")
         await log_action(guild, f"{ctx.author} unmuted {member}.")
     except Exception as e:
-        await ctx.send(f"Failed to unmute: {e}")
+        await OUTBOX.send(ctx, f"Failed to unmute: {e}")
 
 
 @bot.tree.command(name="unmute")
 @app_commands.describe(member="Member to unmute")
+@mod_only()
 async def slash_unmute(interaction: discord.Interaction, member: discord.Member):
-    cfg = get_guild_config(interaction.guild.id)
-    mod_role = cfg.get("mod_role")
-    user = interaction.user
-    if not (user.guild.permissions.administrator or user.guild.permissions.manage_guild):
-        if mod_role:
-            role = discord.utils.get(interaction.guild.roles, name=mod_role)
-            if not (role and role in user.roles):
-                await interaction.response.send_message("You don't have permission.", ephemeral=True)
-                return
-        else:
-            await interaction.response.send_message("You don't have permission.", ephemeral=True)
-            return
     guild = interaction.guild
-    role = discord.utils.get(guild.roles, name="Ron Muted")
+    role = resolve_role(guild, MUTE_ROLE_NAME)
     if not role:
         await interaction.response.send_message("No mute role exists.", ephemeral=True)
         return
     try:
         await member.remove_roles(role)
+        LEDGER.cancel(guild.id, member.id, "unmute")
         await interaction.response.send_message(f"Unmuted {member}.")
         await log_action(guild, f"{interaction.user} unmuted {member}.")
     except Exception as e:
         await interaction.response.send_message(f"Failed to unmute: {e}", ephemeral=True)
 
 
+# Automod. Every (guild, member) pair that posts gets a sliding window of
+# (time, content hash, mentions) entries plus running totals, so checking a
+# message is O(1) amortized: expired entries fall off the left, the new one goes
+# on the right and the totals are compared with the guild's limits. Windows are
+# kept in least-recently-active order and dropped after AUTOMOD_IDLE seconds of
+# silence (or beyond AUTOMOD_MAX_TRACKED), so memory follows active posters.
+AUTOMOD_SETTINGS = {  # setting -> (config key, min, max)
+    "messages": ("automod_messages", 2, 50),
+    "window": ("automod_window", 1, 60),
+    "duplicates": ("automod_duplicates", 1, 50),
+    "mentions": ("automod_mentions", 1, 100),
+    "mute": ("automod_mute_minutes", 0, 1440),
+}
+AUTOMOD_IDLE = 120.0
+AUTOMOD_MAX_TRACKED = 20_000    # about 1.4KB each
+AUTOMOD_COOLDOWN = 30.0     # ignore a member for this long after a trigger while the mute lands
+
+
+class _FloodWindow:
+    __slots__ = ("events", "hashes", "mentions", "last", "quiet_until")
+
+    def __init__(self):
+        self.events = deque()   # (time, content hash or None, mentions)
+        self.hashes = {}        # content hash -> occurrences in the window
+        self.mentions = 0
+        self.last = 0.0
+        self.quiet_until = 0.0
+
+    def drop_oldest(self):
+        _at, digest, mentions = self.events.popleft()
+        self.mentions -= mentions
+        if digest is not None:
+            left = self.hashes[digest] - 1
+            if left:
+                self.hashes[digest] = left
+            else:
+                del self.hashes[digest]
+
+    def reset(self):
+        self.events.clear()
+        self.hashes.clear()
+        self.mentions = 0
+
+
+class FloodDetector:
+    def __init__(self):
+        self.windows = OrderedDict()   # (guild id, user id) -> _FloodWindow, least recently active first
+        self.triggered = 0
+
+    def check(self, key, now, digest, mentions, limits):
+        """Record one message; returns ``(kind, description)`` if it crosses a limit, else None."""
+        max_messages, span, max_duplicates, max_mentions = limits
+        self._evict(now)
+        state = self.windows.get(key)
+        if state is None:
+            state = self.windows[key] = _FloodWindow()
+        else:
+            self.windows.move_to_end(key)
+        state.last = now
+        if now < state.quiet_until:
+            return None
+        events = state.events
+        while events and (events[0][0] <= now - span or len(events) > max_messages):
+            state.drop_oldest()
+        events.append((now, digest, mentions))
+        state.mentions += mentions
+        repeats = 0
+        if digest is not None:
+            repeats = state.hashes[digest] = state.hashes.get(digest, 0) + 1
+        if len(events) > max_messages:
+            reason = ("flood", f"{len(events)} messages in {span}s")
+        elif repeats > max_duplicates:
+            reason = ("duplicates", f"the same message {repeats} times in {span}s")
+        elif state.mentions > max_mentions:
+            reason = ("mentions", f"{state.mentions} mentions in {span}s")
+        else:
+            return None
+        state.reset()
+        state.quiet_until = now + AUTOMOD_COOLDOWN
+        self.triggered += 1
+        return reason
+
+    def _evict(self, now):
+        # two evictions per message drain idle windows faster than new ones can arrive
+        windows = self.windows
+        for _ in range(2):
+            if not windows:
+                return
+            key = next(iter(windows))
+            if len(windows) < AUTOMOD_MAX_TRACKED and windows[key].last > now - AUTOMOD_IDLE:
+                return
+            del windows[key]
+
+
+AUTOMOD = FloodDetector()
+METRICS.describe("kevin_automod_triggers_total", "Members muted by automod, by reason")
+
+
+def automod_limits(cfg):
+    return (cfg["automod_messages"], cfg["automod_window"], cfg["automod_duplicates"], cfg["automod_mentions"])
+
+
+def automod_check(message):
+    """Feed a guild message to the flood detector and mute the author if it trips."""
+    cfg = get_guild_config(message.guild.id)
+    if not cfg["automod"]:
+        return
+    author = message.author
+    content = message.content
+    digest = hash(content.casefold()) if content else None
+    mentions = len(message.mentions) + len(message.role_mentions) + message.mention_everyone
+    tripped = AUTOMOD.check((message.guild.id, author.id), time.monotonic(), digest, mentions, automod_limits(cfg))
+    if tripped is None or not isinstance(author, discord.Member) or is_moderator(author):
+        return
+    kind, reason = tripped
+    METRICS.inc("kevin_automod_triggers_total", kind=kind)
+    minutes = cfg["automod_mute_minutes"]
+    SUPERVISOR.start(f"automod:{message.guild.id}:{author.id}",
+                     lambda: automod_mute(message.guild, author, minutes, reason), owner="automod")
+
+
+async def automod_mute(guild, member, minutes, reason):
+    await mute_member(guild, member, minutes, reason=f"Automod: {reason}")
+    length = f" for {minutes} minute(s)" if minutes else ""
+    await log_action(guild, f"Automod muted {member}{length}: {reason}.")
+
+
 # Modset group (view and set prefix, mod role, log/welcome channels)
 @commands.guild_only()
 @bot.group(name="modset", invoke_without_command=True)
@@ -628,14 +3543,14 @@ async def modset(ctx):
     alias_list = ', '.join(f"{k}->{v}" for k, v in aliases.items()) if aliases else 'none'
     msg = (
         f"Prefix: {cfg.get('prefix')}\n"
-        f"Mod role: {cfg.get('mod_role')}\n"
-        f"Log channel: {cfg.get('log_channel')}\n"
-        f"Welcome channel: {cfg.get('welcome_channel')}\n"
+        f"Mod role: {describe_ref(cfg.get('mod_role'), resolve_role(ctx.guild, cfg.get('mod_role')))}\n"
+        f"Log channel: {describe_ref(cfg.get('log_channel'), resolve_channel(ctx.guild, cfg.get('log_channel')))}\n"
+        f"Welcome channel: {describe_ref(cfg.get('welcome_channel'), resolve_channel(ctx.guild, cfg.get('welcome_channel')))}\n"
         f"Timezone: {cfg.get('timezone')}\n"
-        f"Reminder channel: {cfg.get('reminder_channel')}\n"
+        f"Reminder channel: {describe_ref(cfg.get('reminder_channel'), resolve_channel(ctx.guild, cfg.get('reminder_channel')))}\n"
         f"Aliases: {alias_list}"
     )
-    await ctx.send(msg)
+    await OUTBOX.send(ctx, msg)
 
 
 @modset.command(name="prefix")
@@ -643,50 +3558,44 @@ async def modset(ctx):
 async def modset_prefix(ctx, prefix: str):
     cfg = get_guild_config(ctx.guild.id)
     cfg["prefix"] = prefix
-    save_configs()
-    await ctx.send(f"Prefix set to {prefix}")
+    invalidate_prefix(ctx.guild.id)
+    save_configs(ctx.guild.id)
+    await OUTBOX.send(ctx, f"Prefix set to {prefix}")
 
 
 @modset.command(name="modrole")
 @commands.has_permissions(manage_guild=True)
 async def modset_modrole(ctx, *, role_name: str):
     cfg = get_guild_config(ctx.guild.id)
-    cfg["mod_role"] = role_name
-    save_configs()
-    await ctx.send(f"Mod role set to {role_name}")
+    cfg["mod_role"] = role_ref(ctx.guild, role_name) if role_name else None
+    invalidate_auth(ctx.guild.id)
+    save_configs(ctx.guild.id)
+    await OUTBOX.send(ctx, f"Mod role set to {role_name}")
 
 
 @modset.command(name="logchannel")
 @commands.has_permissions(manage_guild=True)
 async def modset_logchannel(ctx, channel_name: str):
     cfg = get_guild_config(ctx.guild.id)
-    cfg["log_channel"] = channel_name
-    save_configs()
-    await ctx.send(f"Log channel set to {channel_name}")
+    cfg["log_channel"] = channel_ref(ctx.guild, channel_name) if channel_name else None
+    save_configs(ctx.guild.id)
+    await OUTBOX.send(ctx, f"Log channel set to {channel_name}")
 
 
 @modset.command(name="welcome")
 @commands.has_permissions(manage_guild=True)
 async def modset_welcome(ctx, channel_name: str):
     cfg = get_guild_config(ctx.guild.id)
-    cfg["welcome_channel"] = channel_name
-    save_configs()
-    await ctx.send(f"Welcome channel set to {channel_name}")
+    cfg["welcome_channel"] = channel_ref(ctx.guild, channel_name) if channel_name else None
+    save_configs(ctx.guild.id)
+    await OUTBOX.send(ctx, f"Welcome channel set to {channel_name}")
 
 
 # Website monitoring support has been removed to simplify the project and remove external HTTP dependencies.
 # (aiohttp is no longer required.)
 
 
-@bot.event
-async def on_ready():
-    log(f'Bot is online as {bot.user}')
-    try:
-        await bot.tree.sync()
-        log("Synced application (slash) commands with Discord")
-    except Exception as e:
-        log(f"Failed to sync application commands: {e}")
-    # Rotate statuses every 5 minutes
+async def rotate_presence():
     statuses = [
         discord.Activity(name="Watching you make mistakes"),
         discord.Streaming(name="copyrighted music at full volume", url="https://twitch.tv/placeholder"),
@@ -710,75 +3619,155 @@ async def on_ready():
     ]
     while True:
         for status in itertools.cycle(statuses):
-            await bot.change_presence(activity=status)
+            await OUTBOX.call(("gateway", "presence"), lambda: bot.change_presence(activity=status))
             await asyncio.sleep(10800)  # rotate every 3 hours
 
 
+@bot.event
+async def on_ready():
+    # on_ready fires again after every reconnect; startup work that must run once lives in setup_hook
+    log(f'Bot is online as {bot.user} (ready {time.time() - STARTED_AT:.1f}s after start)')
+    LEDGER.reconcile()
+    RANDOM_MESSAGES.load()
+    # a singleton, so reconnects don't stack up extra rotation loops
+    SUPERVISOR.start("presence", rotate_presence)
+
+
+@bot.before_invoke
+async def _stamp_command(ctx):
+    ctx.started = time.perf_counter()
+
+
+@bot.after_invoke
+async def _log_command(ctx):
+    elapsed = time.perf_counter() - ctx.started
+    METRICS.observe("kevin_command_latency_seconds", elapsed, command=ctx.command.qualified_name, kind="prefix")
+    latency_ms = round(elapsed * 1000, 1)
+    logger.info(f"Command {ctx.command.qualified_name} by {ctx.author} took {latency_ms}ms",
+                extra={"guild": ctx.guild.id if ctx.guild else None, "command": ctx.command.qualified_name,
+                       "latency_ms": latency_ms})
+
+
+@bot.event
+async def on_app_command_completion(interaction, command):
+    # measured from the interaction's creation, so this includes gateway delay
+    elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+    METRICS.observe("kevin_command_latency_seconds", elapsed, command=command.qualified_name, kind="slash")
+    latency_ms = round(elapsed * 1000, 1)
+    logger.info(f"Slash command /{command.qualified_name} by {interaction.user} took {latency_ms}ms",
+                extra={"guild": interaction.guild_id, "command": command.qualified_name, "latency_ms": latency_ms})
+
+
 # configuration helpers
 @bot.group(name="config")
 @commands.has_permissions(manage_guild=True)
 async def config(ctx):
     """View or change guild configuration. Available subcommands: show, prefix, modrole,
-    logchannel, welcome, timezone, remindchan, alias."""
+    logchannel, welcome, timezone, remindchan, automod, alias."""
     if ctx.invoked_subcommand is None:
-        await ctx.send("Usage: config <subcommand> (show|prefix|modrole|logchannel|welcome|timezone|remindchan|alias)")
+        await ctx.send("Usage: config <subcommand> (show|prefix|modrole|logchannel|welcome|timezone|remindchan|automod|alias)")
 
 
 @config.command(name="show")
 async def config_show(ctx):
     cfg = get_guild_config(ctx.guild.id)
     # use simple string concatenation to avoid confusing backticks inside an f-string
-    await ctx.send("```\n" + json.dumps(cfg, indent=2) + "\n```")
+    await ctx.send("```\n" + json.dumps(cfg.as_dict(), indent=2) + "\n```")
 
 
 @config.command(name="prefix")
 async def config_prefix(ctx, new_prefix: str):
     cfg = get_guild_config(ctx.guild.id)
     cfg["prefix"] = new_prefix
-    save_configs()
+    invalidate_prefix(ctx.guild.id)
+    save_configs(ctx.guild.id)
     await ctx.send(f"Prefix set to `{new_prefix}`")
 
 
 @config.command(name="modrole")
 async def config_modrole(ctx, *, role_name: str = None):
     cfg = get_guild_config(ctx.guild.id)
-    cfg["mod_role"] = role_name
-    save_configs()
+    cfg["mod_role"] = role_ref(ctx.guild, role_name) if role_name else None
+    invalidate_auth(ctx.guild.id)
+    save_configs(ctx.guild.id)
     await ctx.send(f"Mod role set to `{role_name}`")
 
 
 @config.command(name="logchannel")
 async def config_logchannel(ctx, *, channel_name: str = None):
     cfg = get_guild_config(ctx.guild.id)
-    cfg["log_channel"] = channel_name
-    save_configs()
+    cfg["log_channel"] = channel_ref(ctx.guild, channel_name) if channel_name else None
+    save_configs(ctx.guild.id)
     await ctx.send(f"Log channel set to `{channel_name}`")
 
 
 @config.command(name="welcome")
 async def config_welcome(ctx, *, channel_name: str = None):
     cfg = get_guild_config(ctx.guild.id)
-    cfg["welcome_channel"] = channel_name
-    save_configs()
+    cfg["welcome_channel"] = channel_ref(ctx.guild, channel_name) if channel_name else None
+    save_configs(ctx.guild.id)
     await ctx.send(f"Welcome channel set to `{channel_name}`")
 
 
 @config.command(name="timezone")
 async def config_timezone(ctx, timezone: str = None):
+    if timezone:
+        try:
+            get_zone(timezone)
+        except commands.BadArgument as e:
+            await ctx.send(str(e))
+            return
     cfg = get_guild_config(ctx.guild.id)
     cfg["timezone"] = timezone
-    save_configs()
+    save_configs(ctx.guild.id)
     await ctx.send(f"Timezone set to `{timezone}`")
 
 
 @config.command(name="remindchan")
 async def config_remindchan(ctx, *, channel_name: str = None):
     cfg = get_guild_config(ctx.guild.id)
-    cfg["reminder_channel"] = channel_name
-    save_configs()
+    cfg["reminder_channel"] = channel_ref(ctx.guild, channel_name) if channel_name else None
+    save_configs(ctx.guild.id)
     await ctx.send(f"Default reminder channel set to `{channel_name}`")
 
 
+def automod_summary(cfg):
+    minutes = cfg["automod_mute_minutes"]
+    return (f"Automod is {'on' if cfg['automod'] else 'off'}: within {cfg['automod_window']}s, at most "
+            f"{cfg['automod_messages']} messages, {cfg['automod_duplicates']} copies of one message and "
+            f"{cfg['automod_mentions']} mentions; offenders are muted "
+            + (f"for {minutes} minute(s)." if minutes else "until unmuted."))
+
+
+def set_automod(guild_id, setting, value):
+    """Apply ``config automod <setting> <value>``; returns the reply text."""
+    cfg = get_guild_config(guild_id)
+    setting = (setting or "").lower()
+    if setting in ("on", "off"):
+        cfg["automod"] = setting == "on"
+    elif setting in AUTOMOD_SETTINGS:
+        key, low, high = AUTOMOD_SETTINGS[setting]
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            return f"`{setting}` needs a whole number from {low} to {high}."
+        if not low <= number <= high:
+            return f"`{setting}` must be from {low} to {high}."
+        cfg[key] = number
+    elif setting:
+        return "Usage: config automod [on|off|" + "|".join(AUTOMOD_SETTINGS) + " <value>]"
+    else:
+        return automod_summary(cfg)
+    save_configs(guild_id)
+    return automod_summary(cfg)
+
+
+@config.command(name="automod")
+async def config_automod(ctx, setting: str = None, value: str = None):
+    """Show automod limits, turn it on/off, or set messages, window, duplicates, mentions or mute."""
+    await ctx.send(set_automod(ctx.guild.id, setting, value))
+
+
 @config.group(name="alias")
 async def config_alias(ctx):
     if ctx.invoked_subcommand is None:
@@ -790,7 +3779,8 @@ async def config_alias_add(ctx, alias: str, *, expansion: str):
     cfg = get_guild_config(ctx.guild.id)
     al = cfg.setdefault("aliases", {})
     al[alias] = expansion
-    save_configs()
+    invalidate_aliases(ctx.guild.id)
+    save_configs(ctx.guild.id)
     await ctx.send(f"Alias `{alias}` -> `{expansion}` added.")
 
 
@@ -800,7 +3790,8 @@ async def config_alias_remove(ctx, alias: str):
     al = cfg.get("aliases", {})
     if alias in al:
         del al[alias]
-        save_configs()
+        invalidate_aliases(ctx.guild.id)
+        save_configs(ctx.guild.id)
         await ctx.send(f"Alias `{alias}` removed.")
     else:
         await ctx.send(f"No alias named `{alias}`")
@@ -826,7 +3817,7 @@ async def slash_config_show(interaction: discord.Interaction):
         await interaction.response.send_message("You must have Manage Server permission.", ephemeral=True)
         return
     cfg = get_guild_config(interaction.guild.id)
-    await interaction.response.send_message("```\n" + json.dumps(cfg, indent=2) + "\n```", ephemeral=True)
+    await interaction.response.send_message("```\n" + json.dumps(cfg.as_dict(), indent=2) + "\n```", ephemeral=True)
 
 @config_group.command(name="prefix")
 @app_commands.describe(new_prefix="New command prefix")
@@ -836,7 +3827,8 @@ async def slash_config_prefix(interaction: discord.Interaction, new_prefix: str)
         return
     cfg = get_guild_config(interaction.guild.id)
     cfg["prefix"] = new_prefix
-    save_configs()
+    invalidate_prefix(interaction.guild.id)
+    save_configs(interaction.guild.id)
     await interaction.response.send_message(f"Prefix set to `{new_prefix}`", ephemeral=True)
 
 @config_group.command(name="timezone")
@@ -845,9 +3837,14 @@ async def slash_config_timezone(interaction: discord.Interaction, timezone: str)
     if not interaction.user.guild.permissions.manage_guild:
         await interaction.response.send_message("You must have Manage Server permission.", ephemeral=True)
         return
+    try:
+        get_zone(timezone)
+    except commands.BadArgument as e:
+        await interaction.response.send_message(str(e), ephemeral=True)
+        return
     cfg = get_guild_config(interaction.guild.id)
     cfg["timezone"] = timezone
-    save_configs()
+    save_configs(interaction.guild.id)
     await interaction.response.send_message(f"Timezone set to `{timezone}`", ephemeral=True)
 
 @config_group.command(name="remindchan")
@@ -857,11 +3854,23 @@ async def slash_config_remindchan(interaction: discord.Interaction, channel_name
         await interaction.response.send_message("You must have Manage Server permission.", ephemeral=True)
         return
     cfg = get_guild_config(interaction.guild.id)
-    cfg["reminder_channel"] = channel_name
-    save_configs()
+    cfg["reminder_channel"] = channel_ref(interaction.guild, channel_name) if channel_name else None
+    save_configs(interaction.guild.id)
     await interaction.response.send_message(f"Default reminder channel set to `{channel_name}`", ephemeral=True)
 
 
+@config_group.command(name="automod")
+@app_commands.describe(setting="on, off, or the limit to change (omit to show the current limits)",
+                       value="New value for messages, window (seconds), duplicates, mentions or mute (minutes)")
+@app_commands.choices(setting=[app_commands.Choice(name=name, value=name)
+                               for name in ("on", "off", *AUTOMOD_SETTINGS)])
+async def slash_config_automod(interaction: discord.Interaction, setting: str = None, value: int = None):
+    if not interaction.user.guild.permissions.manage_guild:
+        await interaction.response.send_message("You must have Manage Server permission.", ephemeral=True)
+        return
+    await interaction.response.send_message(set_automod(interaction.guild.id, setting, value), ephemeral=True)
+
+
 # alias subcommands
 @config_group.command(name="alias_add")
 @app_commands.describe(alias="alias text", expansion="command to run")
@@ -872,7 +3881,8 @@ async def slash_config_alias_add(interaction: discord.Interaction, alias: str, e
     cfg = get_guild_config(interaction.guild.id)
     al = cfg.setdefault("aliases", {})
     al[alias] = expansion
-    save_configs()
+    invalidate_aliases(interaction.guild.id)
+    save_configs(interaction.guild.id)
     await interaction.response.send_message(f"Alias `{alias}` -> `{expansion}` added.", ephemeral=True)
 
 @config_group.command(name="alias_remove")
@@ -885,7 +3895,8 @@ async def slash_config_alias_remove(interaction: discord.Interaction, alias: str
     al = cfg.get("aliases", {})
     if alias in al:
         del al[alias]
-        save_configs()
+        invalidate_aliases(interaction.guild.id)
+        save_configs(interaction.guild.id)
         await interaction.response.send_message(f"Alias `{alias}` removed.", ephemeral=True)
     else:
         await interaction.response.send_message(f"Alias `{alias}` not found.", ephemeral=True)
@@ -906,13 +3917,49 @@ async def slash_config_alias_list(interaction: discord.Interaction):
 # register the group
 bot.tree.add_command(config_group)
 
+# Application command sync. The command tree is fingerprinted and the hash of
+# the last successful sync is kept in the store, so restarts only re-upload the
+# tree when a command actually changed. KEVIN_DEV_GUILD syncs to one guild
+# instead of globally (guild commands update instantly while developing).
+DEV_GUILD_ID = int(os.environ["KEVIN_DEV_GUILD"]) if os.environ.get("KEVIN_DEV_GUILD") else None
+
+
+def command_tree_fingerprint(guild=None):
+    payload = []
+    for cmd in bot.tree.get_commands(guild=guild):
+        try:
+            payload.append(cmd.to_dict(bot.tree))
+        except TypeError:  # discord.py < 2.4
+            payload.append(cmd.to_dict())
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+async def sync_commands(force=False):
+    """Sync the command tree if its fingerprint changed (or always, with ``force``). Returns True if synced."""
+    guild = discord.Object(DEV_GUILD_ID) if DEV_GUILD_ID else None
+    if guild:
+        bot.tree.copy_global_to(guild=guild)
+    fingerprint = command_tree_fingerprint(guild)
+    key = f"command_tree:{bot.application_id}:{DEV_GUILD_ID or 'global'}"
+    row = STORE.query("SELECT value FROM kv WHERE key = ?", (key,))
+    if not force and row and row[0][0] == fingerprint:
+        log("Application commands unchanged since last sync; skipping")
+        return False
+    started = time.perf_counter()
+    await bot.tree.sync(guild=guild)
+    STORE.execute("INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)", (key, fingerprint))
+    log(f"Synced application (slash) commands with Discord in {(time.perf_counter() - started) * 1000:.0f}ms"
+        + (f" (dev guild {DEV_GUILD_ID})" if guild else ""))
+    return True
+
+
 # Admin command to force-sync application commands
 @bot.command()
 @commands.has_permissions(administrator=True)
 async def synccommands(ctx):
     """Force-sync slash/application commands with Discord (admin only)."""
     try:
-        await bot.tree.sync()
+        await sync_commands(force=True)
         await ctx.send("✅ Synced application (slash) commands with Discord.")
         log(f"{ctx.author} triggered command sync")
     except Exception as e:
@@ -922,18 +3969,179 @@ async def synccommands(ctx):
 
 @bot.tree.command(name="synccommands")
 async def slash_synccommands(interaction: discord.Interaction):
-    if not getattr(interaction.user, 'guild_permissions', None) or not interaction.user.guild.permissions.administrator:
+    if not getattr(interaction.user, 'guild_permissions', None) or not interaction.user.guild_permissions.administrator:
         await interaction.response.send_message("You must be a server administrator to use this.", ephemeral=True)
         return
+    # a full sync can outlast the 3 second interaction deadline
+    await interaction.response.defer(thinking=True)
     try:
-        await bot.tree.sync()
-        await interaction.response.send_message("✅ Synced application (slash) commands with Discord.")
+        await sync_commands(force=True)
+        await interaction.followup.send("✅ Synced application (slash) commands with Discord.")
         log(f"{interaction.user} (slash) triggered command sync")
     except Exception as e:
-        await interaction.response.send_message(f"Failed to sync commands: {e}", ephemeral=True)
+        await interaction.followup.send(f"Failed to sync commands: {e}", ephemeral=True)
         log(f"Manual slash sync failed: {e}")
 
 
+# Runtime metrics: gauges, the loop-lag probe, gateway/HTTP counters and the
+# /metrics endpoint (see the Metrics class near the top of the file).
+LOOP_LAG_INTERVAL = 0.5
+LOOP_LAG = {"last": 0.0, "max": 0.0}
+
+METRICS.gauge("kevin_uptime_seconds", lambda: round(time.time() - STARTED_AT, 1), "Seconds since start")
+METRICS.gauge("kevin_gateway_latency_seconds", lambda: gateway_latency(), "Heartbeat latency reported by the gateway")
+METRICS.gauge("kevin_event_loop_lag_last_seconds", lambda: LOOP_LAG["last"], "Most recent event loop lag sample")
+METRICS.gauge("kevin_messages_seen", lambda: MESSAGE_STATS["seen"], "Messages received by on_message")
+METRICS.gauge("kevin_messages_skipped", lambda: MESSAGE_STATS["skipped"],
+              "Messages dropped by the non-command fast path")
+METRICS.gauge("kevin_automod_tracked_members", lambda: len(AUTOMOD.windows),
+              "Members with an active automod window")
+METRICS.gauge("kevin_reminders_pending", lambda: REMINDERS.pending(), "Reminders waiting in the store")
+METRICS.gauge("kevin_reminders_loaded", lambda: len(REMINDERS.loaded), "Reminders held in the scheduler heap")
+METRICS.gauge("kevin_timed_actions_pending", lambda: LEDGER.pending(), "Timed moderation actions in the ledger")
+METRICS.gauge("kevin_log_entries_queued", lambda: sum(len(q) for q in LOG_QUEUES.values()),
+              "Moderation log entries waiting to be shipped")
+METRICS.gauge("kevin_asyncio_tasks", lambda: len(asyncio.all_tasks()), "Tasks alive on the event loop")
+METRICS.gauge("kevin_outbound_queued", lambda: OUTBOX.pending(), "Outbound messages waiting to be sent")
+METRICS.gauge("kevin_outbound_throttled_destinations", lambda: len(OUTBOX.parked),
+              "Destinations waiting for their rate limit to refill")
+METRICS.gauge("kevin_supervised_tasks", lambda: len(SUPERVISOR.owners), "Background tasks tracked by the supervisor")
+METRICS.gauge("kevin_guilds", lambda: len(bot.guilds), "Guilds the bot is in")
+METRICS.gauge("kevin_cached_members", lambda: cache_sizes()["members"], "Members held in discord.py's member cache")
+METRICS.gauge("kevin_cached_messages", lambda: len(bot.cached_messages), "Messages held in discord.py's message cache")
+METRICS.describe("kevin_member_fetches_total", "Members fetched over REST because they weren't cached")
+
+
+def cache_sizes():
+    return {
+        "members": sum(len(guild.members) for guild in bot.guilds),
+        "users": len(bot.users),
+        "messages": len(bot.cached_messages),
+        "configs": len(CONFIGS),
+        "prefixes": len(PREFIX_CACHE),
+        "aliases": len(ALIAS_TABLES),
+        "indexes": len(GUILD_INDEX),
+        "auth": len(AUTH_CACHE),
+    }
+
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return 0.0
+
+
+def gateway_latency():
+    # bot.latency is NaN until the first heartbeat is acknowledged
+    return 0.0 if bot.latency != bot.latency else bot.latency
+
+
+async def loop_lag_monitor():
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        lag = max(loop.time() - started - LOOP_LAG_INTERVAL, 0.0)
+        LOOP_LAG["last"] = lag
+        LOOP_LAG["max"] = max(LOOP_LAG["max"], lag)
+        METRICS.observe("kevin_event_loop_lag_seconds", lag)
+
+
+async def _serve_metrics(reader, writer):
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), 5)
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, body = "200 OK", METRICS.render().encode()
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except Exception:
+        pass
+    finally:
+        writer.close()
+
+
+def _count_http_requests():
+    request = bot.http.request
+
+    async def counted(route, **kwargs):
+        METRICS.inc("kevin_http_requests_total", method=route.method, route=route.path)
+        return await request(route, **kwargs)
+
+    bot.http.request = counted
+
+
+async def start_metrics():
+    _count_http_requests()
+    SUPERVISOR.start("loop-lag", loop_lag_monitor, owner="metrics")
+    if not METRICS_PORT:
+        return
+    try:
+        await asyncio.start_server(_serve_metrics, METRICS_HOST, METRICS_PORT)
+        log(f"Metrics available at http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+    except OSError as e:
+        log(f"Metrics endpoint disabled: {e}")
+
+
+@bot.event
+async def on_connect():
+    METRICS.inc("kevin_gateway_events_total", type="connect")
+
+
+@bot.event
+async def on_disconnect():
+    METRICS.inc("kevin_gateway_events_total", type="disconnect")
+
+
+@bot.event
+async def on_resumed():
+    METRICS.inc("kevin_gateway_events_total", type="resume")
+
+
+def stats_summary():
+    lines = [
+        f"Uptime: {round((time.time() - STARTED_AT) / 3600, 1)}h | Gateway latency: {round(gateway_latency() * 1000)}ms",
+        f"Loop lag: {LOOP_LAG['last'] * 1000:.1f}ms (max {LOOP_LAG['max'] * 1000:.1f}ms)",
+        f"Messages: {MESSAGE_STATS['seen']} seen, {MESSAGE_STATS['skipped']} skipped by the fast path",
+        f"Automod: {AUTOMOD.triggered} mute(s), {len(AUTOMOD.windows)} member(s) tracked",
+        f"Reminders: {REMINDERS.pending()} pending ({len(REMINDERS.loaded)} loaded) | Timed actions: {LEDGER.pending()}",
+        f"Tasks: {len(asyncio.all_tasks())} | Guilds: {len(bot.guilds)}",
+        f"Memory: {current_rss_mb():.0f}MB RSS, profile {MEMORY_PROFILE}, "
+        f"{sum(guild.chunked for guild in bot.guilds)}/{len(bot.guilds)} guilds chunked",
+        "Caches: " + ", ".join(f"{name} {size}" for name, size in cache_sizes().items()),
+        "Outbound queued: " + (", ".join(f"{PRIORITY_NAMES[p]} {n}" for p, n in sorted(OUTBOX.queued.items()) if n)
+                               or "none") + f" | {len(OUTBOX.parked)} destination(s) throttled",
+        "Supervised: " + (", ".join(f"{owner} {n}" for owner, n in sorted(SUPERVISOR.counts().items())) or "none"),
+    ]
+    hists = sorted(METRICS.histograms_for("kevin_command_latency_seconds").items(), key=lambda kv: -kv[1].count)
+    for command, hist in hists[:5]:
+        lines.append(f"  {command}: {hist.count} calls, p50 <= {hist.quantile(0.5) * 1000:g}ms, "
+                     f"p99 <= {hist.quantile(0.99) * 1000:g}ms")
+    return "\n".join(lines)
+
+
+@bot.command()
+@commands.has_permissions(administrator=True)
+async def stats(ctx):
+    """Show runtime statistics (admin only)."""
+    await ctx.send("```\n" + stats_summary() + "\n```")
+
+
+@bot.tree.command(name="stats")
+async def slash_stats(interaction: discord.Interaction):
+    if not getattr(interaction.user, 'guild_permissions', None) or not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("You must be a server administrator to use this.", ephemeral=True)
+        return
+    await interaction.response.send_message("```\n" + stats_summary() + "\n```", ephemeral=True)
+
+
 # Run
 TOKEN = os.environ.get("DISCORD_TOKEN")
 if not TOKEN:
@@ -941,4 +4149,7 @@ if not TOKEN:
     raise SystemExit("Missing DISCORD_TOKEN")
 
 if __name__ == '__main__':
-    bot.run(TOKEN)
+    try:
+        bot.run(TOKEN)
+    finally:
+        flush_configs_now()
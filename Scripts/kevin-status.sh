@@ -62,10 +62,14 @@ else
   echo "No log file found at $DESKTOP_PATH"
 fi
 
-# Show persistent reminders count if file exists
-REM_FILE="$DESKTOP_PATH/persistent_reminders.json"
-if [ -f "$REM_FILE" ]; then
-  COUNT=$(jq -r '. | length' "$REM_FILE" 2>/dev/null || echo "?")
+# Show persistent reminders count if the store exists
+if [ -n "${KEVIN_STORE_PATH:-}" ]; then
+  STORE_FILE="$(eval echo \"$KEVIN_STORE_PATH\")"
+else
+  STORE_FILE="$SCRIPT_DIR/kevin.db"
+fi
+if [ -f "$STORE_FILE" ]; then
+  COUNT=$(python3 -c 'import sqlite3, sys; print(sqlite3.connect(sys.argv[1]).execute("SELECT COUNT(*) FROM reminders").fetchone()[0])' "$STORE_FILE" 2>/dev/null || echo "?")
   echo "Persistent reminders stored: $COUNT"
 fi
 
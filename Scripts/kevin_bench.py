@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""Offline benchmark for Kevin's hot paths.
+
+Imports Kevin_Bot.py without connecting to Discord, feeds it synthetic guilds,
+members, messages and interactions, and reports throughput, p50/p99 latency and
+peak memory per scenario. Results can be saved as a JSON baseline and compared
+against on later runs:
+
+    python3 Scripts/kevin_bench.py --out bench_baseline.json
+    python3 Scripts/kevin_bench.py --compare bench_baseline.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+SCENARIOS = ("on_message", "determine_prefix", "aliases", "config", "remind", "reminder_fire", "automod")
+
+
+def load_bot(workdir):
+    # isolate everything the bot writes, and never open the metrics port
+    os.environ.setdefault("DISCORD_TOKEN", "benchmark")
+    os.environ["KEVIN_DESKTOP_PATH"] = str(workdir)
+    os.environ["KEVIN_STORE_PATH"] = str(Path(workdir) / "bench.db")
+    os.environ["KEVIN_METRICS_PORT"] = "0"
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import Kevin_Bot as kb
+    kb.logger.setLevel(logging.WARNING)
+    return kb
+
+
+# Stub Discord objects: just the attributes Kevin's handlers touch.
+class FakeChannel:
+    def __init__(self, channel_id, name, guild=None):
+        self.id = channel_id
+        self.name = name
+        self.guild = guild
+        self.sent = 0
+
+    async def send(self, *args, **kwargs):
+        self.sent += 1
+
+
+class FakeGuild:
+    def __init__(self, guild_id, channels=5, roles=10):
+        self.id = guild_id
+        self.name = f"guild-{guild_id}"
+        self.text_channels = [FakeChannel(guild_id * 1000 + i, f"chan-{i}", self) for i in range(channels)]
+        self.channels = list(self.text_channels)
+        self.roles = [SimpleNamespace(id=guild_id * 1000 + 500 + i, name=f"role-{i}") for i in range(roles)]
+        self.chunked = True
+        self._channels = {ch.id: ch for ch in self.text_channels}
+        self._roles = {role.id: role for role in self.roles}
+
+    def get_channel(self, channel_id):
+        return self._channels.get(channel_id)
+
+    def get_role(self, role_id):
+        return self._roles.get(role_id)
+
+    def get_member(self, member_id):
+        return None
+
+
+class FakeMember:
+    def __init__(self, member_id, guild, bot=False):
+        self.id = member_id
+        self.guild = guild
+        self.bot = bot
+        self.mention = f"<@{member_id}>"
+        self.guild_permissions = SimpleNamespace(administrator=False, manage_guild=False)
+
+    def get_role(self, role_id):
+        return None
+
+    async def send(self, *args, **kwargs):
+        pass
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def summarize(name, samples_ns, elapsed, ops, **extra):
+    result = {
+        "scenario": name,
+        "ops": ops,
+        "ops_per_sec": round(ops / elapsed, 1) if elapsed else 0.0,
+        "p50_us": round(percentile(samples_ns, 0.5) / 1000, 2),
+        "p99_us": round(percentile(samples_ns, 0.99) / 1000, 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    result.update(extra)
+    return result
+
+
+async def paced(count, rate):
+    """Yield indexes, sleeping as needed to hold ``rate`` per second (0 = unpaced)."""
+    started = time.perf_counter()
+    for i in range(count):
+        if rate and i % 100 == 0:
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        yield i
+
+
+def make_messages(kb, guilds, count, command_ratio, aliases):
+    rng = random.Random(1)
+    chatter = ["hello there", "lol", "anyone up?", "that was a great game last night", "brb"]
+    commands_ = ["?ping", "?roll 2d6", "?quote", f"<@{kb.bot.user.id}> ping"] + [f"?a{i} extra" for i in range(min(aliases, 20))]
+    messages = []
+    for _ in range(count):
+        guild = rng.choice(guilds)
+        content = rng.choice(commands_) if rng.random() < command_ratio else rng.choice(chatter)
+        author = FakeMember(rng.randrange(1, 10 ** 6), guild, bot=rng.random() < 0.02)
+        messages.append(SimpleNamespace(content=content, author=author, guild=guild, channel=guild.text_channels[0]))
+    return messages
+
+
+async def bench_on_message(kb, guilds, args):
+    processed = 0
+
+    async def process_commands(message):
+        nonlocal processed
+        processed += 1
+        await kb.bot.get_prefix(message)
+
+    kb.bot.process_commands = process_commands
+    messages = make_messages(kb, guilds, args.messages, args.command_ratio, args.aliases)
+    samples = []
+    started = time.perf_counter()
+    async for i in paced(len(messages), args.rate):
+        message = messages[i]
+        t0 = time.perf_counter_ns()
+        await kb.on_message(message)
+        samples.append(time.perf_counter_ns() - t0)
+    elapsed = time.perf_counter() - started
+    return summarize("on_message", samples, elapsed, len(messages), reached_commands=processed,
+                     skipped=kb.MESSAGE_STATS["skipped"])
+
+
+async def bench_determine_prefix(kb, guilds, args):
+    messages = make_messages(kb, guilds, args.messages, 1.0, 0)
+    samples = []
+    started = time.perf_counter()
+    for message in messages:
+        t0 = time.perf_counter_ns()
+        await kb.determine_prefix(kb.bot, message)
+        samples.append(time.perf_counter_ns() - t0)
+    return summarize("determine_prefix", samples, time.perf_counter() - started, len(messages))
+
+
+async def bench_aliases(kb, guilds, args):
+    rng = random.Random(2)
+    bodies = [f"a{rng.randrange(args.aliases * 2)} some arguments" for _ in range(args.messages)]
+    samples = []
+    started = time.perf_counter()
+    for body in bodies:
+        guild = guilds[rng.randrange(len(guilds))]
+        cfg = kb.get_guild_config(guild.id)
+        t0 = time.perf_counter_ns()
+        kb.expand_alias(guild.id, cfg, body)
+        samples.append(time.perf_counter_ns() - t0)
+    return summarize("aliases", samples, time.perf_counter() - started, len(bodies), aliases_per_guild=args.aliases)
+
+
+async def bench_config(kb, guilds, args):
+    rng = random.Random(3)
+    ops = min(args.messages, 20000)
+    samples = []
+    started = time.perf_counter()
+    for i in range(ops):
+        guild = guilds[rng.randrange(len(guilds))]
+        t0 = time.perf_counter_ns()
+        cfg = kb.get_guild_config(guild.id)
+        cfg.setdefault("aliases", {})[f"bench{i % 50}"] = "ping"
+        kb.invalidate_aliases(guild.id)
+        kb.save_configs(guild.id)
+        samples.append(time.perf_counter_ns() - t0)
+    elapsed = time.perf_counter() - started
+    dirty = len(kb._DIRTY_GUILDS)
+    t0 = time.perf_counter()
+    kb.flush_configs_now()
+    flush_ms = round((time.perf_counter() - t0) * 1000, 2)
+    return summarize("config", samples, elapsed, ops, dirty_guilds=dirty, flush_ms=flush_ms)
+
+
+async def bench_remind(kb, guilds, args):
+    async def respond(*a, **kw):
+        pass
+
+    samples = []
+    started = time.perf_counter()
+    async for i in paced(args.reminders, args.rate):
+        guild = guilds[i % len(guilds)]
+        member = FakeMember(i, guild)
+        t0 = time.perf_counter_ns()
+        if i % 2:
+            ctx = SimpleNamespace(author=member, guild=guild, channel=guild.text_channels[0], send=respond)
+            await kb.remind.callback(ctx, text=f"10m bench reminder {i}")
+        else:
+            interaction = SimpleNamespace(user=member, guild_id=guild.id, channel_id=guild.text_channels[0].id,
+                                          response=SimpleNamespace(send_message=respond))
+            await kb.slash_remind.callback(interaction, "10m", f"bench reminder {i}")
+        samples.append(time.perf_counter_ns() - t0)
+    elapsed = time.perf_counter() - started
+    return summarize("remind", samples, elapsed, args.reminders, pending=kb.REMINDERS.pending())
+
+
+async def bench_reminder_fire(kb, guilds, args):
+    scheduler = kb.REMINDERS
+    count = min(args.reminders, 20000)
+    delivered = 0
+    done = asyncio.Event()
+
+    async def deliver(row):
+        nonlocal delivered
+        delivered += 1
+        if delivered == count:
+            done.set()
+
+    scheduler._deliver = deliver
+    scheduler.store.execute("DELETE FROM reminders")
+    now = time.time()
+    scheduler.store.executemany(
+        "INSERT INTO reminders (due, user_id, guild_id, channel_id, content, created) VALUES (?, ?, ?, ?, ?, ?)",
+        [(now + 1 + (i % 1000) / 1000, i, None, None, "fire", now) for i in range(count)],
+    )
+    scheduler.count = scheduler._count()  # rows written behind the scheduler's back
+    started = time.perf_counter()
+    scheduler.start()
+    await asyncio.wait_for(done.wait(), 60)
+    elapsed = time.perf_counter() - started
+    stats = scheduler.stats()
+    return summarize("reminder_fire", [], elapsed, count, jitter_p50_ms=round(stats["p50_ms"], 2),
+                     jitter_p99_ms=round(stats["p99_ms"], 2), jitter_max_ms=round(stats["max_ms"], 2))
+
+
+async def bench_automod(kb, guilds, args):
+    rng = random.Random(3)
+    chatter = ["hello there", "lol", "anyone up?", "that was a great game last night", "brb"]
+    spammers = [FakeMember(10 ** 7 + i, guilds[i % len(guilds)]) for i in range(max(1, args.guilds // 10))]
+    messages = []
+    for _ in range(args.messages):
+        if rng.random() < 0.1:
+            author = rng.choice(spammers)
+            content, mentions = "FREE NITRO http://example.invalid", [author] * rng.randrange(3)
+        else:
+            guild = rng.choice(guilds)
+            author, content, mentions = FakeMember(rng.randrange(1, 10 ** 6), guild), rng.choice(chatter), []
+        messages.append(SimpleNamespace(content=content, author=author, guild=author.guild, mentions=mentions,
+                                        role_mentions=[], mention_everyone=False))
+    for guild in guilds:
+        kb.get_guild_config(guild.id)["automod"] = True
+    samples = []
+    started = time.perf_counter()
+    async for i in paced(len(messages), args.rate):
+        t0 = time.perf_counter_ns()
+        kb.automod_check(messages[i])
+        samples.append(time.perf_counter_ns() - t0)
+    elapsed = time.perf_counter() - started
+    for guild in guilds:
+        kb.get_guild_config(guild.id)["automod"] = False
+    return summarize("automod", samples, elapsed, len(messages), tripped=kb.AUTOMOD.triggered,
+                     tracked=len(kb.AUTOMOD.windows))
+
+
+BENCHES = {
+    "on_message": bench_on_message,
+    "determine_prefix": bench_determine_prefix,
+    "aliases": bench_aliases,
+    "config": bench_config,
+    "remind": bench_remind,
+    "reminder_fire": bench_reminder_fire,
+    "automod": bench_automod,
+}
+
+
+def compare(results, baseline_path, tolerance):
+    baseline = {r["scenario"]: r for r in json.loads(Path(baseline_path).read_text())["results"]}
+    regressions = []
+    for result in results:
+        base = baseline.get(result["scenario"])
+        if not base:
+            continue
+        if base["ops_per_sec"] and result["ops_per_sec"] < base["ops_per_sec"] * (1 - tolerance):
+            regressions.append(f"{result['scenario']}: ops/sec {base['ops_per_sec']} -> {result['ops_per_sec']}")
+        if base["p99_us"] and result["p99_us"] > base["p99_us"] * (1 + tolerance):
+            regressions.append(f"{result['scenario']}: p99 {base['p99_us']}us -> {result['p99_us']}us")
+    return regressions
+
+
+async def run(args, kb):
+    kb.bot._connection.user = SimpleNamespace(id=4242, bot=True)
+    guilds = [FakeGuild(10 ** 6 + i) for i in range(args.guilds)]
+    for guild in guilds:
+        cfg = kb.get_guild_config(guild.id)
+        cfg["aliases"] = {f"a{i}": "ping" for i in range(args.aliases)}
+    results = []
+    for name in args.scenarios:
+        result = await BENCHES[name](kb, guilds, args)
+        results.append(result)
+        print(json.dumps(result))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--guilds", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--command-ratio", type=float, default=0.05, help="share of messages that are commands")
+    parser.add_argument("--aliases", type=int, default=100, help="aliases per guild")
+    parser.add_argument("--reminders", type=int, default=20000)
+    parser.add_argument("--rate", type=float, default=0, help="messages/reminders per second (0 = unpaced)")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--out", help="write results to this JSON baseline file")
+    parser.add_argument("--compare", help="baseline JSON to compare against; exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression before failing")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="kevin-bench-") as workdir:
+        kb = load_bot(workdir)
+        results = asyncio.run(run(args, kb))
+        kb.STORE.conn.close()
+
+    if args.out:
+        Path(args.out).write_text(json.dumps({
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+            "results": results,
+        }, indent=2))
+        print(f"Baseline written to {args.out}")
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Run Kevin as several worker processes, each owning a contiguous range of shards.
+
+    python3 Scripts/kevin_cluster.py run --workers 4            # shard count from Discord
+    python3 Scripts/kevin_cluster.py run --workers 4 --shards 16
+    python3 Scripts/kevin_cluster.py invalidate 1234567890       # drop a guild's cached config everywhere
+
+Workers share the SQLite store (KEVIN_STORE_PATH), so config, reminders and the
+moderation ledger stay consistent; each worker only fires reminders and timed
+actions for guilds on its own shards.
+"""
+import argparse
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+BOT = SCRIPT_DIR / "Kevin_Bot.py"
+IDENTIFY_INTERVAL = 5.5  # Discord allows one identify per 5 seconds at the default max_concurrency
+
+
+def load_env():
+    try:
+        from dotenv import load_dotenv
+        load_dotenv(PROJECT_ROOT / "kevin.env")
+    except ImportError:
+        pass
+
+
+def recommended_shards(token):
+    import requests
+    resp = requests.get("https://discord.com/api/v10/gateway/bot",
+                        headers={"Authorization": f"Bot {token}"}, timeout=10)
+    resp.raise_for_status()
+    return resp.json()["shards"]
+
+
+def shard_ranges(shards, workers):
+    """Split shard ids 0..shards-1 into ``workers`` contiguous, near-equal ranges."""
+    workers = max(1, min(workers, shards))
+    base, extra = divmod(shards, workers)
+    ranges, start = [], 0
+    for i in range(workers):
+        size = base + (1 if i < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+def spawn(cluster_id, shard_ids, shards):
+    env = dict(os.environ,
+               KEVIN_CLUSTER_ID=str(cluster_id),
+               KEVIN_SHARD_COUNT=str(shards),
+               KEVIN_SHARD_IDS=",".join(map(str, shard_ids)))
+    return subprocess.Popen([sys.executable, str(BOT)], env=env)
+
+
+def run(args):
+    token = os.environ.get("DISCORD_TOKEN")
+    if not token:
+        sys.exit("DISCORD_TOKEN environment variable not set.")
+    shards = args.shards or recommended_shards(token)
+    ranges = shard_ranges(shards, args.workers or os.cpu_count() or 1)
+    print(f"Starting {len(ranges)} worker(s) for {shards} shard(s)")
+
+    procs = {}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for proc in procs.values():
+            if proc.poll() is None:
+                proc.terminate()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for cluster_id, shard_ids in enumerate(ranges):
+        if stopping:
+            break
+        procs[cluster_id] = spawn(cluster_id, shard_ids, shards)
+        print(f"Worker {cluster_id} (pid {procs[cluster_id].pid}): shards {shard_ids[0]}-{shard_ids[-1]}")
+        # stagger identifies so workers don't trip the session start limit
+        time.sleep(IDENTIFY_INTERVAL * len(shard_ids))
+
+    # restart crashed workers until asked to stop
+    while not stopping:
+        time.sleep(1)
+        for cluster_id, proc in list(procs.items()):
+            code = proc.poll()
+            if code is not None and not stopping:
+                print(f"Worker {cluster_id} exited with {code}; restarting in {args.restart_delay}s")
+                time.sleep(args.restart_delay)
+                procs[cluster_id] = spawn(cluster_id, ranges[cluster_id], shards)
+
+    for proc in procs.values():
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def invalidate(args):
+    store = Path(os.path.expanduser(os.environ.get("KEVIN_STORE_PATH", str(SCRIPT_DIR / "kevin.db"))))
+    conn = sqlite3.connect(str(store), timeout=30)
+    with conn:
+        conn.executemany(
+            "INSERT INTO config_invalidations (guild_id, origin, created) VALUES (?, -1, ?)",
+            [(str(guild_id), time.time()) for guild_id in args.guild_ids],
+        )
+    conn.close()
+    print(f"Invalidated {len(args.guild_ids)} guild config(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kevin Bot cluster launcher")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_p = sub.add_parser("run", help="start the worker processes")
+    run_p.add_argument("--workers", type=int, default=0, help="worker processes (default: CPU count)")
+    run_p.add_argument("--shards", type=int, default=0, help="total shards (default: Discord's recommendation)")
+    run_p.add_argument("--restart-delay", type=float, default=5.0)
+    inv_p = sub.add_parser("invalidate", help="make every worker reload a guild's config")
+    inv_p.add_argument("guild_ids", nargs="+", type=int)
+    args = parser.parse_args()
+
+    load_env()
+    if args.command == "run":
+        run(args)
+    else:
+        invalidate(args)
+
+
+if __name__ == "__main__":
+    main()